@@ -0,0 +1,293 @@
+"""Camera-free benchmark of the recognition loop.
+
+    python -m benchmarks.recognition --video clip.mp4 --sizes 100 1000 10000 100000
+    python -m benchmarks.recognition --video frames/ --plant 4 --out before.json
+
+For every gallery size a synthetic gallery is built and, in a fresh
+process so peak RSS is per size:
+
+* match: single-face lookups against the gallery, half of them near an
+  enrolled row and half unknown;
+* video (with --video): the recording, a file or a folder of images, is
+  replayed through RecognitionWorker.process (detect -> encode -> match)
+  and accepted matches are logged to a throwaway attendance log.
+
+The report is JSON with per-stage latency percentiles in milliseconds,
+throughput and peak RSS in MB, so two commits can be compared directly.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from benchmarks.synthetic import GALLERY_SIZES, random_encodings, synthetic_gallery
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+MATCH_QUERIES = 2000
+# Spread of a probe around its enrolled row; well inside the tolerance
+PROBE_NOISE = 0.02
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None if unknown."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Bytes on macOS, kilobytes elsewhere
+        return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    except ImportError:
+        pass
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                        ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                        ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        ctypes.windll.psapi.GetProcessMemoryInfo(
+            ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb)
+        return round(counters.PeakWorkingSetSize / (1024 * 1024), 1)
+    except (AttributeError, OSError):
+        return None
+
+
+def percentiles(samples):
+    if not samples:
+        return {"count": 0}
+    ms = np.asarray(samples) * 1000.0
+    p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+    return {
+        "count": len(ms),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(p50), 3),
+        "p90_ms": round(float(p90), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+
+def iter_frames(source, max_frames=None):
+    """Yield BGR frames from a video file or a folder of images, in order."""
+    import cv2
+    count = 0
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            if max_frames is not None and count >= max_frames:
+                return
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                frame = cv2.imread(os.path.join(source, name))
+                if frame is not None:
+                    count += 1
+                    yield frame
+        return
+    video = cv2.VideoCapture(source)
+    if not video.isOpened():
+        raise SystemExit(f"Cannot open {source}")
+    try:
+        while max_frames is None or count < max_frames:
+            ret, frame = video.read()
+            if not ret:
+                return
+            count += 1
+            yield frame
+    finally:
+        video.release()
+
+
+def planted_faces(source, count):
+    """Encode up to count faces from the start of the recording."""
+    import cv2
+    import face_recognition
+    found = []
+    for frame in iter_frames(source):
+        if len(found) >= count:
+            break
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        found.extend(face_recognition.face_encodings(rgb))
+    return found[:count]
+
+
+def _recording_scheduler():
+    """AdaptiveScheduler that also keeps every stage sample."""
+    from face_engine.scheduler import AdaptiveScheduler
+
+    class RecordingScheduler(AdaptiveScheduler):
+        def __init__(self):
+            super().__init__()
+            self.samples = defaultdict(list)
+
+        def record(self, stage, seconds):
+            self.samples[stage].append(seconds)
+            if stage in self.stages:
+                super().record(stage, seconds)
+
+    return RecordingScheduler()
+
+
+def bench_match(gallery, queries=MATCH_QUERIES, seed=1):
+    rng = np.random.default_rng(seed)
+    n = len(gallery)
+    known = gallery.matrix[rng.integers(0, n, queries // 2)]
+    known = known + rng.normal(0, PROBE_NOISE, known.shape).astype(np.float32)
+    unknown = random_encodings(queries - len(known), seed + 1)
+    probes = np.concatenate([known, unknown])
+    rng.shuffle(probes)
+
+    samples = []
+    accepted = 0
+    start = time.perf_counter()
+    for probe in probes:
+        t0 = time.perf_counter()
+        match = gallery.match(probe[None, :])[0]
+        samples.append(time.perf_counter() - t0)
+        accepted += match.accepted
+    wall = time.perf_counter() - start
+    return {
+        "latency": percentiles(samples),
+        "lookups_per_s": round(len(probes) / wall, 1),
+        "accepted": int(accepted),
+        "indexed": gallery.index is not None,
+    }
+
+
+def bench_video(gallery, source, max_frames=None, workers=0, motion_gate=True):
+    from database.attendance_index import AttendanceIndex
+    from database.attendance_log import AttendanceLog
+    from face_engine.pipeline import RecognitionWorker
+
+    scheduler = _recording_scheduler()
+    pool = None
+    if workers:
+        from face_engine.worker_pool import EncodingPool
+        pool = EncodingPool(gallery, workers)
+    worker = RecognitionWorker(None, gallery, pool=pool, scheduler=scheduler)
+    if not motion_gate:
+        worker.motion_gate.threshold = 0.0
+
+    log_dir = tempfile.mkdtemp(prefix="eduscan-bench-")
+    log = AttendanceLog(log_dir)
+    index = AttendanceIndex()
+    frame_samples = []
+    frames = faces = logged = 0
+    start = time.perf_counter()
+    try:
+        for seq, frame in enumerate(iter_frames(source, max_frames), 1):
+            t0 = time.perf_counter()
+            result = worker.process(seq, frame)
+            if result is not None:
+                faces += len(result.locations)
+                with scheduler.measure("log"):
+                    for match in result.matches:
+                        if not match.accepted or index.is_marked(match.student_id):
+                            continue
+                        index.mark(match.student_id)
+                        log.append({"student_id": match.student_id, "name": match.name,
+                                    "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")})
+                        logged += 1
+            frame_samples.append(time.perf_counter() - t0)
+            frames += 1
+        wall = time.perf_counter() - start
+    finally:
+        log.close()
+        shutil.rmtree(log_dir, ignore_errors=True)
+        if pool is not None:
+            pool.close()
+
+    stages = {stage: percentiles(samples) for stage, samples in scheduler.samples.items()}
+    stages["frame"] = percentiles(frame_samples)
+    return {
+        "frames": frames,
+        "faces_detected": faces,
+        "faces_encoded": worker.encoded,
+        "logged": logged,
+        "motion_skip_ratio": round(worker.motion_gate.skip_ratio, 3),
+        "wall_s": round(wall, 3),
+        "frames_per_s": round(frames / wall, 2) if wall else 0.0,
+        "faces_per_s": round(faces / wall, 2) if wall else 0.0,
+        "stages": stages,
+    }
+
+
+def run_size(size, args):
+    """One gallery size, end to end; runs in its own process."""
+    planted = planted_faces(args.video, args.plant) if args.video and args.plant else ()
+    t0 = time.perf_counter()
+    gallery = synthetic_gallery(size, seed=args.seed, planted=planted,
+                                use_index=None if args.index == "auto" else args.index == "on")
+    result = {
+        "gallery_size": size,
+        "gallery_build_s": round(time.perf_counter() - t0, 3),
+        "planted": len(planted),
+        "match": bench_match(gallery, args.queries),
+    }
+    if args.video:
+        result["video"] = bench_video(gallery, args.video, args.max_frames, args.workers,
+                                      motion_gate=not args.no_motion_gate)
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark recognition without a camera.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(GALLERY_SIZES))
+    parser.add_argument("--video", help="video file or folder of images to replay")
+    parser.add_argument("--max-frames", type=int, default=None)
+    parser.add_argument("--plant", type=int, default=0,
+                        help="plant this many faces from the video into each gallery")
+    parser.add_argument("--workers", type=int, default=0, help="encode with an EncodingPool of this size")
+    parser.add_argument("--index", choices=("auto", "on", "off"), default="auto")
+    parser.add_argument("--no-motion-gate", action="store_true", help="run detection on every frame")
+    parser.add_argument("--queries", type=int, default=MATCH_QUERIES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "args": vars(args),
+        "results": [],
+    }
+    for size in args.sizes:
+        print(f"[INFO] Benchmarking gallery of {size}...", file=sys.stderr)
+        # A fresh process per size keeps peak RSS from carrying over
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            report["results"].append(executor.submit(run_size, size, args).result())
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"[INFO] Report written to {args.out}", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
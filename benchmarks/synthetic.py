@@ -0,0 +1,39 @@
+import numpy as np
+from face_engine.ann_index import IVFIndex, ANN_MIN_GALLERY
+from face_engine.gallery import FaceGallery, ENCODING_DIM, DEFAULT_TOLERANCE
+
+# dlib descriptors sit close to the unit sphere; random points on it are
+# far apart (~1.4), so synthetic students never match a real face by chance
+GALLERY_SIZES = (100, 1000, 10000, 100000)
+
+
+def random_encodings(n, seed=0):
+    rng = np.random.default_rng(seed)
+    encodings = rng.standard_normal((n, ENCODING_DIM)).astype(np.float32)
+    encodings /= np.linalg.norm(encodings, axis=1, keepdims=True)
+    return encodings
+
+
+def synthetic_gallery(n, seed=0, tolerance=DEFAULT_TOLERANCE, planted=(), use_index=None):
+    """A FaceGallery of n random students.
+
+    planted encodings (e.g. faces taken from the replayed video) overwrite
+    evenly spaced rows so matches and attendance logging are exercised.
+    use_index=None builds an in-memory IVF index at ANN_MIN_GALLERY, as
+    FaceGallery.from_database does.
+    """
+    encodings = random_encodings(n, seed)
+    ids = [f"SYN/{i:06d}" for i in range(n)]
+    names = [f"Synthetic {i}" for i in range(n)]
+    planted = list(planted)[:n]
+    if planted:
+        step = n // len(planted)
+        for k, encoding in enumerate(planted):
+            encodings[k * step] = encoding
+    gallery = FaceGallery(ids, names, encodings, tolerance)
+    if use_index is None:
+        use_index = n >= ANN_MIN_GALLERY
+    if use_index and n:
+        # Kept in memory; never touches face_engine/ann_index.npz
+        gallery.index = IVFIndex.build(gallery.matrix)
+    return gallery
@@ -0,0 +1,48 @@
+from datetime import datetime
+from database.attendance_log import LOG_DIR, get_attendance_log, iter_records
+
+
+def today():
+    return datetime.now().strftime("%Y-%m-%d")
+
+
+class AttendanceIndex:
+    """In-memory set of who has been marked today, for O(1) duplicate checks.
+
+    Loaded once at session start and updated on every mark, so the
+    recognition loop never reads the attendance log from disk.
+    """
+
+    def __init__(self):
+        self._marked = set()
+        # Entries from scripts that do not track units are keyed by student only
+        self._any_unit = set()
+
+    @classmethod
+    def load(cls, log_dir=LOG_DIR, day=None):
+        """Build the index from the day's attendance log file only.
+
+        Today's marks are loaded once; checks after this are in memory.
+        """
+        # Make sure a legacy JSON log has been migrated before reading
+        get_attendance_log()
+        index = cls()
+        day = day or today()
+        for log in iter_records(log_dir, day):
+            index.mark(log.get("student_id"), log.get("unit_id"), day)
+        return index
+
+    def mark(self, student_id, unit_id=None, day=None):
+        day = day or today()
+        self._marked.add((student_id, unit_id, day))
+        self._any_unit.add((student_id, day))
+
+    def is_marked(self, student_id, unit_id=None, day=None):
+        """Check a student for a unit; unit_id=None matches any unit."""
+        day = day or today()
+        if unit_id is None:
+            return (student_id, day) in self._any_unit
+        return (student_id, unit_id, day) in self._marked
+
+    def __len__(self):
+        return len(self._marked)
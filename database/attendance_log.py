@@ -0,0 +1,175 @@
+import atexit
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from metrics import timer
+
+LOG_DIR = "attendance_logs"
+LEGACY_LOG = "attendance_logs.json"
+
+# A day's log rolls over to a new numbered file past this size
+MAX_BYTES = 5 * 1024 * 1024
+# Records are flushed to the OS on every append, but only fsync'd every
+# FSYNC_EVERY records or FSYNC_INTERVAL seconds, whichever comes first
+FSYNC_EVERY = 20
+FSYNC_INTERVAL = 2.0
+
+# 2025-09-19.jsonl, 2025-09-19.1.jsonl, ...
+_FILE_RE = re.compile(r"^(\d{4}-\d{2}-\d{2})(?:\.(\d+))?\.jsonl$")
+
+
+def _log_files(log_dir=LOG_DIR, day=None):
+    """Log files sorted oldest first, optionally limited to one day."""
+    if not os.path.isdir(log_dir):
+        return []
+    files = []
+    for name in os.listdir(log_dir):
+        m = _FILE_RE.match(name)
+        if m and (day is None or m.group(1) == day):
+            files.append((m.group(1), int(m.group(2) or 0), os.path.join(log_dir, name)))
+    return [path for _, _, path in sorted(files)]
+
+
+def iter_records(log_dir=LOG_DIR, day=None):
+    """Stream attendance records lazily, oldest first.
+
+    Lines that fail to parse (a write torn by a crash) are skipped.
+    """
+    for path in _log_files(log_dir, day):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    print(f"[WARNING] Skipping corrupt attendance record in {path}")
+
+
+class AttendanceLog:
+    """Append-only, line-delimited attendance log rotated by day and size."""
+
+    def __init__(self, log_dir=LOG_DIR, max_bytes=MAX_BYTES,
+                 fsync_every=FSYNC_EVERY, fsync_interval=FSYNC_INTERVAL):
+        self.log_dir = log_dir
+        self.max_bytes = max_bytes
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self._lock = threading.Lock()
+        self._file = None
+        self._day = None
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def _open_for(self, day):
+        os.makedirs(self.log_dir, exist_ok=True)
+        existing = _log_files(self.log_dir, day)
+        path = existing[-1] if existing else os.path.join(self.log_dir, f"{day}.jsonl")
+        if os.path.exists(path) and os.path.getsize(path) >= self.max_bytes:
+            path = os.path.join(self.log_dir, f"{day}.{len(existing)}.jsonl")
+        self._file = open(path, "a", encoding="utf-8")
+        self._day = day
+
+    def _rotate_if_needed(self, day):
+        if self._file is not None and self._day == day and self._file.tell() < self.max_bytes:
+            return
+        self._close_file()
+        self._open_for(day)
+
+    def append(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        day = record.get("timestamp", "")[:10] or datetime.now().strftime("%Y-%m-%d")
+        with self._lock, timer("json_write"):
+            self._rotate_if_needed(day)
+            self._file.write(line)
+            self._file.flush()
+            self._pending += 1
+            if (self._pending >= self.fsync_every
+                    or time.monotonic() - self._last_sync >= self.fsync_interval):
+                self._sync()
+
+    def _sync(self):
+        if self._file is not None and self._pending:
+            os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def sync(self):
+        with self._lock:
+            self._sync()
+
+    def _close_file(self):
+        if self._file is not None:
+            self._sync()
+            self._file.close()
+            self._file = None
+
+    def close(self):
+        with self._lock:
+            self._close_file()
+
+
+def _record_key(record):
+    return record.get("student_id"), record.get("unit_id"), record.get("timestamp")
+
+
+def migrate_legacy_log(legacy_path=LEGACY_LOG, log_dir=LOG_DIR):
+    """One-time move of the old JSON array log into the JSONL files.
+
+    Records already in the JSONL files are skipped, so a migration cut
+    short before the legacy file was renamed can simply run again.
+    """
+    if not os.path.exists(legacy_path):
+        return 0
+    with open(legacy_path, "r", encoding="utf-8") as f:
+        try:
+            records = json.load(f)
+        except ValueError as e:
+            print(f"[ERROR] Could not migrate {legacy_path}: {e}")
+            return 0
+
+    seen = set()
+    for day in {str(record.get("timestamp", ""))[:10] for record in records}:
+        seen.update(_record_key(record) for record in iter_records(log_dir, day))
+
+    log = AttendanceLog(log_dir, fsync_every=len(records) + 1, fsync_interval=float("inf"))
+    migrated = 0
+    for record in records:
+        key = _record_key(record)
+        if key in seen:
+            continue
+        seen.add(key)
+        log.append(record)
+        migrated += 1
+    log.close()
+    os.replace(legacy_path, legacy_path + ".migrated")
+    print(f"[INFO] Migrated {migrated} attendance records to {log_dir}/")
+    return migrated
+
+
+_log = None
+_log_lock = threading.Lock()
+
+
+def get_attendance_log():
+    """Shared log for the process; migrates the legacy file on first use."""
+    global _log
+    with _log_lock:
+        if _log is None:
+            migrate_legacy_log()
+            _log = AttendanceLog()
+            atexit.register(_log.close)
+        return _log
+
+
+def append_attendance(student_id, name, unit_id=None):
+    record = {"student_id": student_id, "name": name}
+    if unit_id is not None:
+        record["unit_id"] = unit_id
+    record["timestamp"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    get_attendance_log().append(record)
+    return record
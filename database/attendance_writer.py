@@ -0,0 +1,132 @@
+import atexit
+import queue
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+from database.connection import checkpoint
+from database.student_db import log_attendance_batch
+from metrics import timer, count
+
+# A batch is committed once it holds FLUSH_BATCH records or its oldest
+# record has waited FLUSH_INTERVAL seconds
+FLUSH_INTERVAL = 0.25
+FLUSH_BATCH = 50
+
+# Queued by flush(); durable requests also checkpoint the WAL
+_FlushRequest = namedtuple("_FlushRequest", ["done", "durable"])
+
+
+class AttendanceWriter(threading.Thread):
+    """Background writer that group-commits attendance marks.
+
+    The recognition loop only enqueues a record; this thread turns bursts
+    of marks into a single INSERT transaction. Commits are not fsynced
+    (WAL with synchronous=NORMAL); flush(durable=True) and stop() also
+    checkpoint the WAL so everything committed is on disk.
+    """
+
+    def __init__(self, flush_interval=FLUSH_INTERVAL, flush_batch=FLUSH_BATCH):
+        super().__init__(daemon=True, name="AttendanceWriter")
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self._queue = queue.Queue()
+        self._stopping = False
+        self.batches = 0
+        self.written = 0
+        self.max_depth = 0
+
+    def submit(self, student_id, name, unit_id=None, timestamp=None):
+        timestamp = timestamp or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self._queue.put((student_id, name, timestamp, unit_id))
+        self.max_depth = max(self.max_depth, self._queue.qsize())
+
+    def depth(self):
+        """Records waiting to be committed."""
+        return self._queue.qsize()
+
+    def run(self):
+        batch = []
+        waiters = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if isinstance(item, _FlushRequest):
+                waiters.append(item)
+            elif item is not None:
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+
+            due = deadline is not None and time.monotonic() >= deadline
+            if batch and (due or waiters or len(batch) >= self.flush_batch):
+                self._write(batch)
+                batch = []
+                deadline = None
+            if any(w.durable for w in waiters):
+                self._checkpoint()
+            for waiter in waiters:
+                waiter.done.set()
+            waiters = []
+            if self._stopping and self._queue.empty() and not batch:
+                return
+
+    def _write(self, batch):
+        try:
+            with timer("db_write"):
+                log_attendance_batch(batch)
+            count("db_rows", len(batch))
+            self.batches += 1
+            self.written += len(batch)
+        except Exception as e:
+            print(f"[ERROR] Failed to write {len(batch)} attendance records: {e}")
+
+    def _checkpoint(self):
+        try:
+            checkpoint()
+        except Exception as e:
+            print(f"[ERROR] Failed to checkpoint attendance records: {e}")
+
+    def flush(self, timeout=5.0, durable=False):
+        """Block until everything submitted so far is committed.
+
+        With durable=True the commits are also fsynced to disk.
+        """
+        if not self.is_alive():
+            return False
+        done = threading.Event()
+        self._queue.put(_FlushRequest(done, durable))
+        return done.wait(timeout)
+
+    def stop(self, timeout=5.0):
+        self._stopping = True
+        self.flush(timeout, durable=True)
+        self.join(timeout)
+
+    def stats(self):
+        return {
+            "depth": self.depth(),
+            "max_depth": self.max_depth,
+            "batches": self.batches,
+            "written": self.written,
+        }
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_attendance_writer():
+    """Shared writer for the process; flushed and stopped at exit."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = AttendanceWriter()
+            _writer.start()
+            atexit.register(_writer.stop)
+        return _writer
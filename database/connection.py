@@ -0,0 +1,90 @@
+import atexit
+import os
+import sqlite3
+import threading
+import time
+
+DB_PATH = "database/students.db"
+
+# Prepared statements kept per connection; the hot queries are few and fixed
+STATEMENT_CACHE_SIZE = 256
+
+PRAGMAS = (
+    # Readers never block the writer (and vice versa) under WAL
+    "PRAGMA journal_mode=WAL",
+    # Durable at checkpoints; WAL makes NORMAL safe against corruption
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-16000",  # 16 MB page cache
+    "PRAGMA mmap_size=268435456",  # 256 MB
+    "PRAGMA temp_store=MEMORY",
+)
+
+# A writer holding the lock makes other connections wait instead of failing
+BUSY_TIMEOUT = 5.0
+# Attempts at a complete checkpoint before giving up; each may wait up to
+# BUSY_TIMEOUT for open read transactions that pin part of the WAL
+CHECKPOINT_RETRIES = 2
+
+_local = threading.local()
+_all_connections = []
+_all_lock = threading.Lock()
+
+
+def _open(path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # Each connection is only used by the thread that opened it; the check
+    # is relaxed so close_all() can run from the exit handler
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, check_same_thread=False,
+                           cached_statements=STATEMENT_CACHE_SIZE)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def get_connection(path=DB_PATH):
+    """Return this thread's long-lived connection to the database.
+
+    Callers must not close it; commit or roll back as usual.
+    """
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(path)
+    if conn is None:
+        conn = connections[path] = _open(path)
+        with _all_lock:
+            _all_connections.append(conn)
+    return conn
+
+
+def checkpoint(path=DB_PATH, retries=CHECKPOINT_RETRIES):
+    """Copy the WAL into the database file, fsync it and truncate the WAL.
+
+    With synchronous=NORMAL a commit is only durable at the next
+    checkpoint; call this where losing recent commits is not acceptable.
+    Returns False, after retrying, if other connections kept the
+    checkpoint from completing.
+    """
+    conn = get_connection(path)
+    for attempt in range(retries):
+        # (busy, frames in the WAL, frames checkpointed); -1s outside WAL mode
+        busy, log, done = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+        if not busy and done >= log:
+            return True
+        time.sleep(0.05 * (attempt + 1))
+    print(f"[WARNING] WAL checkpoint incomplete ({done} of {log} frames, busy={busy}).")
+    return False
+
+
+def close_all():
+    with _all_lock:
+        for conn in _all_connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        _all_connections.clear()
+    _local.__dict__.clear()
+
+
+atexit.register(close_all)
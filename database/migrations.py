@@ -0,0 +1,270 @@
+"""Versioned schema upgrades for database/students.db.
+
+The schema version lives in PRAGMA user_version. Each step upgrades from
+the previous version and is written to be safe on databases created by
+older builds, which may already have some of the tables.
+
+Run `python -m database.migrations --benchmark 1000000` to time every
+step and the hot view/export/dashboard queries on a synthetic database.
+"""
+import os
+import pickle
+import sqlite3
+import sys
+import tempfile
+import time
+
+
+def _columns(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _add_column(conn, table, column, decl):
+    if column not in _columns(conn, table):
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+
+def _base_tables(conn):
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS students (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        student_id TEXT UNIQUE,
+        name TEXT,
+        face_encoding BLOB,
+        voice_path TEXT
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS attendance (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        student_id TEXT,
+        name TEXT,
+        timestamp TEXT
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS units (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        unit_name TEXT NOT NULL,
+        unit_code TEXT NOT NULL
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS student_units (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        student_id TEXT,
+        unit_id INTEGER
+    )
+    """)
+
+
+def _encoding_blobs(conn):
+    """Float32 encoding blobs with a dimension/version column."""
+    _add_column(conn, "students", "encoding_dim", "INTEGER")
+    _add_column(conn, "students", "encoding_version", "INTEGER")
+    rows = conn.execute(
+        "SELECT id, face_encoding FROM students WHERE encoding_version IS NULL AND face_encoding IS NOT NULL"
+    ).fetchall()
+    if not rows:
+        return
+    from database.student_db import ENCODING_DIM, ENCODING_VERSION, pack_encoding
+
+    for row_id, blob in rows:
+        try:
+            encoding = pickle.loads(blob)
+        except Exception as e:
+            print(f"[WARNING] Could not read encoding for row {row_id}: {e}")
+            continue
+        conn.execute(
+            "UPDATE students SET face_encoding = ?, encoding_dim = ?, encoding_version = ? WHERE id = ?",
+            (pack_encoding(encoding), ENCODING_DIM, ENCODING_VERSION, row_id)
+        )
+    print(f"[INFO] Converted {len(rows)} face encodings to float32 blobs.")
+
+
+def _gallery_change_counter(conn):
+    """meta.gallery_version, bumped by triggers on any change to students."""
+    conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+    conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('gallery_version', 0)")
+    bump = "UPDATE meta SET value = value + 1 WHERE key = 'gallery_version';"
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS students_gallery_insert AFTER INSERT ON students BEGIN {bump} END")
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS students_gallery_delete AFTER DELETE ON students BEGIN {bump} END")
+    conn.execute("CREATE TRIGGER IF NOT EXISTS students_gallery_update "
+                 f"AFTER UPDATE OF student_id, name, face_encoding ON students BEGIN {bump} END")
+
+
+def _attendance_unit_and_date(conn):
+    """unit_id plus an indexable date and a sortable epoch on attendance.
+
+    ts_epoch is the stored local timestamp read as if it were UTC, which
+    keeps it monotonic with the text column and cheap to compute in SQL.
+    """
+    _add_column(conn, "attendance", "unit_id", "INTEGER")
+    _add_column(conn, "attendance", "attendance_date", "TEXT")
+    _add_column(conn, "attendance", "ts_epoch", "INTEGER")
+    conn.execute("""
+        UPDATE attendance
+        SET attendance_date = substr(timestamp, 1, 10),
+            ts_epoch = CAST(strftime('%s', timestamp) AS INTEGER)
+        WHERE attendance_date IS NULL
+    """)
+
+
+def _indexes(conn):
+    # Assignments were never unique; keep the oldest copy of each pair
+    conn.execute("""
+        DELETE FROM student_units WHERE id NOT IN (
+            SELECT MIN(id) FROM student_units GROUP BY unit_id, student_id
+        )
+    """)
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_student_units_unit_student "
+                 "ON student_units(unit_id, student_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_student_units_student "
+                 "ON student_units(student_id, unit_id)")
+    # ViewAttendanceWindow: join on student_id, newest first
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_attendance_student_time "
+                 "ON attendance(student_id, timestamp)")
+    # Export: full table ordered by time, covered without touching rows
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_attendance_time "
+                 "ON attendance(timestamp, student_id, name)")
+    # Dashboard count for a day, and per-unit day lookups
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_attendance_date "
+                 "ON attendance(attendance_date, unit_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_attendance_unit_date "
+                 "ON attendance(unit_id, attendance_date, student_id)")
+
+
+def _roster_change_counter(conn):
+    """meta.roster_version, bumped by triggers on any change to student_units."""
+    conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('roster_version', 0)")
+    bump = "UPDATE meta SET value = value + 1 WHERE key = 'roster_version';"
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS student_units_roster_insert AFTER INSERT ON student_units BEGIN {bump} END")
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS student_units_roster_delete AFTER DELETE ON student_units BEGIN {bump} END")
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS student_units_roster_update AFTER UPDATE ON student_units BEGIN {bump} END")
+
+
+# Position in the list is the version the step upgrades to (1-based)
+MIGRATIONS = [
+    _base_tables,
+    _encoding_blobs,
+    _gallery_change_counter,
+    _attendance_unit_and_date,
+    _indexes,
+    _roster_change_counter,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn, target=SCHEMA_VERSION, timings=None):
+    """Apply every pending step up to target, each in its own transaction."""
+    if conn.in_transaction:
+        conn.commit()
+    current = schema_version(conn)
+    for version in range(current + 1, target + 1):
+        step = MIGRATIONS[version - 1]
+        start = time.perf_counter()
+        conn.execute("BEGIN")
+        try:
+            step(conn)
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        elapsed = time.perf_counter() - start
+        if timings is not None:
+            timings.append((step.__name__.strip("_"), elapsed))
+        print(f"[INFO] Schema upgraded to v{version} ({step.__name__.strip('_')}, {elapsed:.2f}s)")
+    return schema_version(conn)
+
+
+# Hot queries from the GUI, timed before and after the upgrade
+BENCH_QUERIES = {
+    "dashboard_today_legacy": ("SELECT COUNT(*) FROM attendance WHERE DATE(timestamp) = ?", ("2025-06-15",)),
+    "dashboard_today": ("SELECT COUNT(*) FROM attendance WHERE attendance_date = ?", ("2025-06-15",)),
+    "view_attendance": ("""
+        SELECT attendance.student_id, students.name, attendance.timestamp
+        FROM attendance
+        JOIN students ON attendance.student_id = students.student_id
+        JOIN student_units ON students.student_id = student_units.student_id
+        WHERE student_units.unit_id = ?
+        ORDER BY attendance.timestamp DESC
+    """, (3,)),
+    "unit_students": ("""
+        SELECT students.student_id, students.name
+        FROM students
+        JOIN student_units ON students.student_id = student_units.student_id
+        WHERE student_units.unit_id = ?
+    """, (3,)),
+    "export": ("SELECT student_id, name, timestamp FROM attendance ORDER BY timestamp DESC", ()),
+}
+
+
+def _time_queries(conn, names):
+    results = {}
+    for name in names:
+        sql, params = BENCH_QUERIES[name]
+        start = time.perf_counter()
+        conn.execute(sql, params).fetchall()
+        results[name] = round(time.perf_counter() - start, 4)
+    return results
+
+
+def benchmark(rows=1_000_000, students=5000, units=40):
+    """Build a v0 database with `rows` attendance records and time the upgrade."""
+    import random
+    rng = random.Random(0)
+    # The database is only needed for the timings; remove it afterwards
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        conn = sqlite3.connect(path, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        _base_tables(conn)
+
+        conn.execute("BEGIN")
+        conn.executemany("INSERT INTO students (student_id, name) VALUES (?, ?)",
+                         ((f"S{i:06d}", f"student {i}") for i in range(students)))
+        conn.executemany("INSERT INTO units (unit_name, unit_code) VALUES (?, ?)",
+                         ((f"unit {u}", f"U{u:03d}") for u in range(units)))
+        conn.executemany("INSERT INTO student_units (student_id, unit_id) VALUES (?, ?)",
+                         ((f"S{rng.randrange(students):06d}", rng.randrange(1, units + 1))
+                          for _ in range(students * 4)))
+
+        def attendance_rows():
+            for _ in range(rows):
+                day = rng.randrange(1, 366)
+                yield (f"S{rng.randrange(students):06d}", "student",
+                       time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(1735689600 + day * 86400 + rng.randrange(86400))))
+        conn.executemany("INSERT INTO attendance (student_id, name, timestamp) VALUES (?, ?, ?)", attendance_rows())
+        conn.execute("COMMIT")
+
+        before = _time_queries(conn, ["dashboard_today_legacy", "view_attendance", "unit_students", "export"])
+        timings = []
+        migrate(conn, timings=timings)
+        after = _time_queries(conn, ["dashboard_today_legacy", "dashboard_today", "view_attendance",
+                                     "unit_students", "export"])
+        conn.close()
+
+    report = {
+        "rows": rows,
+        "migrations_s": {name: round(t, 3) for name, t in timings},
+        "queries_before_s": before,
+        "queries_after_s": after,
+    }
+    import json
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--benchmark":
+        benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000)
+    else:
+        from database.connection import get_connection
+        migrate(get_connection())
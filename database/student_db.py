@@ -1,75 +1,202 @@
 import sqlite3
 import os
-import pickle
+import numpy as np
+from database.connection import get_connection
+from database.migrations import migrate
 
-DB_PATH = "database/students.db"
+# Face encodings are stored as raw little-endian float32 blobs. Version 1
+# rows hold a pickled numpy array and are converted by the migrations.
+ENCODING_DIM = 128
+ENCODING_VERSION = 2
+ENCODING_DTYPE = np.dtype("<f4")
+ENCODING_BYTES = ENCODING_DIM * ENCODING_DTYPE.itemsize
+
+_schema_ready = False
 
 def init_db():
     os.makedirs("database", exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
+    ensure_schema()
 
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS students (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        student_id TEXT UNIQUE,
-        name TEXT,
-        face_encoding BLOB,
-        voice_path TEXT
-    )
-    """)
-
-    # Attendance Table
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS attendance (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        student_id TEXT,
-        name TEXT,
-        timestamp TEXT
-    )
-    """)
+def pack_encoding(encoding):
+    """Serialize a 128-d encoding to a fixed-size float32 blob."""
+    return np.asarray(encoding, dtype=ENCODING_DTYPE).reshape(ENCODING_DIM).tobytes()
 
-    conn.commit()
-    conn.close()
+def gallery_version():
+    """Change counter for the students table; moves on every enrolment edit."""
+    ensure_schema()
+    row = get_connection().execute("SELECT value FROM meta WHERE key = 'gallery_version'").fetchone()
+    return row[0] if row else 0
+
+def roster_version():
+    """Change counter for student_units; moves whenever assignments change."""
+    ensure_schema()
+    row = get_connection().execute("SELECT value FROM meta WHERE key = 'roster_version'").fetchone()
+    return row[0] if row else 0
+
+def ensure_schema():
+    """Bring the database up to the current schema version, once per process."""
+    global _schema_ready
+    if _schema_ready:
+        return
+    migrate(get_connection())
+    _schema_ready = True
 
 from datetime import datetime
 
-def log_attendance(student_id, name):
-    conn = sqlite3.connect(DB_PATH)
+# attendance_date and ts_epoch are derived in SQL exactly as the migration
+# backfilled them
+INSERT_ATTENDANCE = """
+    INSERT INTO attendance (student_id, name, timestamp, unit_id, attendance_date, ts_epoch)
+    VALUES (?1, ?2, ?3, ?4, substr(?3, 1, 10), CAST(strftime('%s', ?3) AS INTEGER))
+"""
+
+def log_attendance(student_id, name, unit_id=None):
+    ensure_schema()
+    conn = get_connection()
     c = conn.cursor()
     now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    c.execute("INSERT INTO attendance (student_id, name, timestamp) VALUES (?, ?, ?)", 
-              (student_id, name, now))
+    c.execute(INSERT_ATTENDANCE, (student_id, name, now, unit_id))
     conn.commit()
-    conn.close()
+
+def log_attendance_batch(records):
+    """Insert many (student_id, name, timestamp, unit_id) rows in one transaction."""
+    ensure_schema()
+    conn = get_connection()
+    with conn:
+        conn.executemany(INSERT_ATTENDANCE, records)
+
+def normalize_student_id(student_id):
+    """The form IDs are stored in: trimmed, with "/" between the parts."""
+    return (student_id or "").strip().replace("\\", "/")
+
+def student_key(student_id):
+    """Case-insensitive key for comparing IDs typed or read off disk."""
+    return normalize_student_id(student_id).casefold()
 
 def save_student(student_id, name, encoding, voice_path):
-    conn = sqlite3.connect(DB_PATH)
+    student_id = normalize_student_id(student_id)
+    ensure_schema()
+    conn = get_connection()
     c = conn.cursor()
     try:
-        c.execute("INSERT INTO students (student_id, name, face_encoding, voice_path) VALUES (?, ?, ?, ?)",
-                  (student_id, name, pickle.dumps(encoding), voice_path))
+        c.execute("INSERT INTO students (student_id, name, face_encoding, voice_path, encoding_dim, encoding_version) "
+                  "VALUES (?, ?, ?, ?, ?, ?)",
+                  (student_id, name, pack_encoding(encoding), voice_path, ENCODING_DIM, ENCODING_VERSION))
         conn.commit()
         print(f"[INFO] Student {name} saved.")
     except sqlite3.IntegrityError:
+        conn.rollback()
         print("[ERROR] Student ID already exists.")
-    conn.close()
 
-def load_all_encodings():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
+def save_students_batch(students, unit_id=None):
+    """Insert (student_id, name, encoding, voice_path) rows in one transaction.
 
-    c.execute("SELECT student_id, name, face_encoding FROM students")
-    rows = c.fetchall()
+    IDs that already exist are skipped. With unit_id every new student is
+    also assigned to that unit. Returns the number of students inserted.
+    """
+    ensure_schema()
+    conn = get_connection()
+    with conn:
+        # rowcount, unlike total_changes, leaves out the gallery counter
+        # trigger's UPDATE and the ignored duplicates
+        cur = conn.executemany(
+            "INSERT OR IGNORE INTO students (student_id, name, face_encoding, voice_path, encoding_dim, encoding_version) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [(normalize_student_id(sid), name, pack_encoding(encoding), voice_path, ENCODING_DIM, ENCODING_VERSION)
+             for sid, name, encoding, voice_path in students]
+        )
+        inserted = cur.rowcount
+        if unit_id is not None:
+            conn.executemany("INSERT OR IGNORE INTO student_units (student_id, unit_id) VALUES (?, ?)",
+                             [(normalize_student_id(sid), unit_id) for sid, _, _, _ in students])
+    return inserted
+
+def match_student_ids(student_ids):
+    """Map IDs to the stored IDs they refer to, ignoring case.
+
+    A photo under students/INTE/MG/2586/09/22_face.jpg thus finds a student
+    saved as inte/mg/2586/09/22. IDs with no student are left out.
+    """
+    ensure_schema()
+    stored = {student_key(sid): sid for (sid,) in get_connection().execute("SELECT student_id FROM students")}
+    return {sid: stored[student_key(sid)] for sid in student_ids if student_key(sid) in stored}
+
+def update_encodings(pairs):
+    """Replace encodings of existing students from (student_id, encoding) pairs."""
+    ensure_schema()
+    conn = get_connection()
+    with conn:
+        conn.executemany(
+            "UPDATE students SET face_encoding = ?, encoding_dim = ?, encoding_version = ? WHERE student_id = ?",
+            [(pack_encoding(encoding), ENCODING_DIM, ENCODING_VERSION, sid) for sid, encoding in pairs]
+        )
 
+def delete_students(student_ids):
+    """Delete students and their unit assignments in one transaction."""
+    ensure_schema()
+    conn = get_connection()
+    with conn:
+        params = [(sid,) for sid in student_ids]
+        conn.executemany("DELETE FROM student_units WHERE student_id = ?", params)
+        conn.executemany("DELETE FROM students WHERE student_id = ?", params)
+
+def _unpack_encodings(rows):
+    """Build ids, names and the (N, 128) float32 matrix from blob rows.
+
+    All blobs are joined and decoded with a single np.frombuffer call.
+    """
     ids = []
     names = []
-    encodings = []
+    blobs = []
 
     for sid, name, blob in rows:
+        if blob is None or len(blob) != ENCODING_BYTES:
+            print(f"[WARNING] Skipping malformed encoding for {sid}")
+            continue
         ids.append(sid)
         names.append(name)
-        encodings.append(pickle.loads(blob))
+        blobs.append(blob)
 
-    conn.close()
+    encodings = np.frombuffer(b"".join(blobs), dtype=ENCODING_DTYPE).reshape(-1, ENCODING_DIM)
     return ids, names, encodings
+
+def load_all_encodings():
+    ensure_schema()
+    conn = get_connection()
+    c = conn.cursor()
+
+    c.execute("SELECT student_id, name, face_encoding FROM students WHERE encoding_version = ?",
+              (ENCODING_VERSION,))
+    rows = c.fetchall()
+
+    return _unpack_encodings(rows)
+
+def load_unit_encodings(unit_id):
+    """Load encodings only for the students assigned to a unit."""
+    ensure_schema()
+    conn = get_connection()
+    c = conn.cursor()
+
+    try:
+        c.execute("""
+            SELECT student_id, name, face_encoding FROM students
+            WHERE encoding_version = ?
+              AND student_id IN (SELECT student_id FROM student_units WHERE unit_id = ?)
+        """, (ENCODING_VERSION, unit_id))
+        rows = c.fetchall()
+    except sqlite3.OperationalError:
+        # student_units is only created once a unit has been managed
+        rows = []
+
+    return _unpack_encodings(rows)
+
+def load_roster(unit_id=None):
+    """(student_id, name) for every student, or only those assigned to a unit."""
+    ensure_schema()
+    conn = get_connection()
+    if unit_id is None:
+        return conn.execute("SELECT student_id, name FROM students").fetchall()
+    return conn.execute("""
+        SELECT student_id, name FROM students
+        WHERE student_id IN (SELECT student_id FROM student_units WHERE unit_id = ?)
+    """, (unit_id,)).fetchall()
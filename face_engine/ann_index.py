@@ -0,0 +1,119 @@
+import os
+import numpy as np
+
+ANN_INDEX_FILE = "face_engine/ann_index.npz"
+
+# Galleries smaller than this are matched brute force; the scan is cheaper
+# than probing the coarse lists.
+ANN_MIN_GALLERY = 5000
+
+# Number of inverted lists searched per face. Higher values raise recall at
+# the cost of latency; n_probe == n_lists is an exact search.
+DEFAULT_N_PROBE = 8
+DEFAULT_RERANK_K = 10
+
+
+def _sq_distances(a, b):
+    a_sq = np.einsum("ij,ij->i", a, a)
+    b_sq = np.einsum("ij,ij->i", b, b)
+    return np.maximum(a_sq[:, None] + b_sq[None, :] - 2.0 * (a @ b.T), 0.0)
+
+
+class IVFIndex:
+    """Inverted-file (k-means partitioned) index over the face gallery.
+
+    Gallery rows are bucketed under their nearest centroid. A lookup only
+    scans the n_probe buckets closest to the probe and returns the top-k
+    candidates for an exact re-rank by the caller.
+    """
+
+    def __init__(self, centroids, order, offsets, n_probe=DEFAULT_N_PROBE):
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.order = np.asarray(order, dtype=np.int64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.n_probe = n_probe
+
+    @property
+    def n_lists(self):
+        return self.centroids.shape[0]
+
+    @classmethod
+    def build(cls, matrix, n_lists=None, n_probe=DEFAULT_N_PROBE, iterations=12, seed=0):
+        matrix = np.asarray(matrix, dtype=np.float32)
+        n = matrix.shape[0]
+        if n_lists is None:
+            n_lists = max(1, int(np.sqrt(n)))
+        n_lists = min(n_lists, n)
+
+        rng = np.random.default_rng(seed)
+        # Train on a sample; 64 points per list is plenty for k-means
+        sample_size = min(n, n_lists * 64)
+        sample = matrix[rng.choice(n, sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, n_lists, replace=False)].copy()
+
+        for _ in range(iterations):
+            labels = np.argmin(_sq_distances(sample, centroids), axis=1)
+            counts = np.bincount(labels, minlength=n_lists)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            filled = counts > 0
+            centroids[filled] = sums[filled] / counts[filled, None]
+            # Re-seed empty lists so no centroid is wasted
+            empty = np.flatnonzero(~filled)
+            if len(empty):
+                centroids[empty] = sample[rng.choice(sample_size, len(empty), replace=False)]
+
+        labels = np.empty(n, dtype=np.int64)
+        for start in range(0, n, 8192):
+            chunk = matrix[start:start + 8192]
+            labels[start:start + 8192] = np.argmin(_sq_distances(chunk, centroids), axis=1)
+
+        order = np.argsort(labels, kind="stable")
+        offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(labels, minlength=n_lists))
+        return cls(centroids, order, offsets, n_probe)
+
+    def search(self, matrix, probes, k=DEFAULT_RERANK_K):
+        """Return (candidate_indices, distances) per probe, nearest first."""
+        probes = np.asarray(probes, dtype=np.float32)
+        n_probe = min(self.n_probe, self.n_lists)
+        centroid_d = _sq_distances(probes, self.centroids)
+        if n_probe < self.n_lists:
+            nearest = np.argpartition(centroid_d, n_probe - 1, axis=1)[:, :n_probe]
+        else:
+            nearest = np.broadcast_to(np.arange(self.n_lists), centroid_d.shape)
+
+        results = []
+        for probe, lists in zip(probes, nearest):
+            candidates = np.concatenate(
+                [self.order[self.offsets[l]:self.offsets[l + 1]] for l in lists]
+            )
+            if len(candidates) == 0:
+                results.append((candidates, np.empty(0, dtype=np.float32)))
+                continue
+            d = np.linalg.norm(matrix[candidates] - probe, axis=1)
+            top = np.argsort(d)[:k]
+            results.append((candidates[top], d[top]))
+        return results
+
+    def save(self, path=ANN_INDEX_FILE, fingerprint=""):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # Write through a file object so numpy does not append another .npz
+        with open(path + ".tmp", "wb") as f:
+            np.savez(f, centroids=self.centroids, order=self.order,
+                     offsets=self.offsets, fingerprint=np.array(fingerprint))
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path=ANN_INDEX_FILE, fingerprint=None, n_probe=DEFAULT_N_PROBE):
+        """Load a persisted index, or return None if missing or stale."""
+        if path is None or not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                if fingerprint is not None and str(data["fingerprint"]) != fingerprint:
+                    return None
+                return cls(data["centroids"], data["order"], data["offsets"], n_probe)
+        except (OSError, KeyError, ValueError) as e:
+            print(f"[WARNING] Could not load ANN index: {e}")
+            return None
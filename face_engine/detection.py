@@ -0,0 +1,89 @@
+import cv2
+import face_recognition
+import numpy as np
+from face_engine.tracker import iou
+
+# Regions of interest as (x, y, width, height) fractions of the frame, e.g.
+# [(0.2, 0.0, 0.6, 0.8)] for a doorway in the middle of the view. None
+# searches the whole frame.
+ROIS = None
+
+# Width each region is downscaled to for the coarse HOG pass
+COARSE_WIDTH = 320
+
+# Re-detect each coarse hit at full resolution before encoding
+TWO_PASS = True
+
+# Context added around a coarse box before the full-resolution re-detect
+REFINE_MARGIN = 0.3
+
+
+def scale_box(box, sx, sy):
+    """Scale a (top, right, bottom, left) box between frame resolutions."""
+    top, right, bottom, left = box
+    return int(top * sy), int(right * sx), int(bottom * sy), int(left * sx)
+
+
+class FaceDetector:
+    """Two-pass HOG detection restricted to configurable regions.
+
+    Each region is searched on a downscaled copy, then every coarse hit is
+    re-detected at full resolution inside its upscaled box. Returned boxes
+    are in full-frame coordinates, ready for encoding at full resolution.
+    """
+
+    def __init__(self, rois=ROIS, coarse_width=COARSE_WIDTH, two_pass=TWO_PASS,
+                 refine_margin=REFINE_MARGIN):
+        self.rois = rois
+        self.coarse_width = coarse_width
+        self.two_pass = two_pass
+        self.refine_margin = refine_margin
+
+    def regions(self, shape):
+        height, width = shape[:2]
+        if not self.rois:
+            return [(0, 0, width, height)]
+        regions = []
+        for fx, fy, fw, fh in self.rois:
+            x0, y0 = int(fx * width), int(fy * height)
+            x1, y1 = min(width, int((fx + fw) * width)), min(height, int((fy + fh) * height))
+            if x1 > x0 and y1 > y0:
+                regions.append((x0, y0, x1, y1))
+        return regions
+
+    def detect(self, rgb_frame):
+        boxes = []
+        for x0, y0, x1, y1 in self.regions(rgb_frame.shape):
+            region = rgb_frame[y0:y1, x0:x1]
+            scale = min(1.0, self.coarse_width / float(x1 - x0))
+            if scale < 1.0:
+                region = cv2.resize(region, None, fx=scale, fy=scale)
+            else:
+                # dlib needs a contiguous buffer, not a view into the frame
+                region = np.ascontiguousarray(region)
+
+            for coarse in face_recognition.face_locations(region, model='hog'):
+                top, right, bottom, left = scale_box(coarse, 1.0 / scale, 1.0 / scale)
+                box = (top + y0, right + x0, bottom + y0, left + x0)
+                if self.two_pass and scale < 1.0:
+                    box = self.refine(rgb_frame, box)
+                # Overlapping regions can report the same face twice
+                if all(iou(box, other) < 0.5 for other in boxes):
+                    boxes.append(box)
+        return boxes
+
+    def refine(self, rgb_frame, box):
+        """Re-detect a coarse box at full resolution, keeping it if that fails."""
+        top, right, bottom, left = box
+        pad_y = int((bottom - top) * self.refine_margin)
+        pad_x = int((right - left) * self.refine_margin)
+        height, width = rgb_frame.shape[:2]
+        y0, y1 = max(0, top - pad_y), min(height, bottom + pad_y)
+        x0, x1 = max(0, left - pad_x), min(width, right + pad_x)
+
+        window = np.ascontiguousarray(rgb_frame[y0:y1, x0:x1])
+        found = face_recognition.face_locations(window, number_of_times_to_upsample=0, model='hog')
+        if not found:
+            return box
+        t, r, b, l = max(found, key=lambda f: (f[2] - f[0]) * (f[1] - f[3]))
+        return t + y0, r + x0, b + y0, l + x0
@@ -0,0 +1,170 @@
+import hashlib
+import numpy as np
+from collections import namedtuple
+from database.student_db import gallery_version, load_unit_encodings, roster_version
+from face_engine.snapshot import load_gallery_arrays
+from face_engine.ann_index import (
+    IVFIndex, ANN_INDEX_FILE, ANN_MIN_GALLERY, DEFAULT_N_PROBE, DEFAULT_RERANK_K
+)
+
+ENCODING_DIM = 128
+DEFAULT_TOLERANCE = 0.5
+
+# When a unit has no enrolled students with a face on record, match against
+# the whole school instead of refusing to start the session.
+FALLBACK_TO_FULL_GALLERY = True
+
+# index is -1 when the gallery is empty
+Match = namedtuple("Match", ["index", "student_id", "name", "distance", "accepted"])
+NO_MATCH = Match(-1, None, None, float("inf"), False)
+
+
+class FaceGallery:
+    """All enrolled encodings held as one contiguous (N, 128) float32 matrix.
+
+    Every face found in a frame is matched in a single batched (M x N)
+    distance computation instead of a compare_faces + face_distance pass
+    per face.
+    """
+
+    def __init__(self, ids, names, encodings, tolerance=DEFAULT_TOLERANCE):
+        self.ids = list(ids)
+        self.names = list(names)
+        self.tolerance = tolerance
+        if len(encodings):
+            matrix = np.asarray(encodings, dtype=np.float32).reshape(-1, ENCODING_DIM)
+        else:
+            matrix = np.empty((0, ENCODING_DIM), dtype=np.float32)
+        self.matrix = np.ascontiguousarray(matrix)
+        # Squared norms are cached so a match is one matrix product
+        self.sq_norms = np.einsum("ij,ij->i", self.matrix, self.matrix)
+        self.index = None
+        self.rerank_k = DEFAULT_RERANK_K
+        # Set when the matrix is memory-mapped from the on-disk snapshot
+        self.snapshot_path = None
+
+    @classmethod
+    def from_database(cls, tolerance=DEFAULT_TOLERANCE, use_index=None):
+        """Load the full gallery from the memory-mapped snapshot.
+
+        use_index=None enables the ANN index automatically once the gallery
+        reaches ANN_MIN_GALLERY faces.
+        """
+        ids, names, encodings, path = load_gallery_arrays()
+        gallery = cls(ids, names, encodings, tolerance)
+        gallery.snapshot_path = path
+        if use_index is None:
+            use_index = len(gallery) >= ANN_MIN_GALLERY
+        if use_index and len(gallery):
+            gallery.attach_index()
+        return gallery
+
+    def fingerprint(self):
+        """Hash of the gallery contents, used to detect a stale index."""
+        h = hashlib.sha1(self.matrix.tobytes())
+        h.update("\0".join(str(i) for i in self.ids).encode("utf-8"))
+        return h.hexdigest()
+
+    def attach_index(self, path=ANN_INDEX_FILE, n_probe=DEFAULT_N_PROBE,
+                     rerank_k=DEFAULT_RERANK_K, rebuild=False):
+        """Use a persisted IVF index, rebuilding it if the gallery changed.
+
+        path=None builds the index in memory without saving it.
+        """
+        fingerprint = self.fingerprint()
+        index = None if rebuild else IVFIndex.load(path, fingerprint, n_probe)
+        if index is None:
+            print(f"[INFO] Building ANN index over {len(self)} encodings...")
+            index = IVFIndex.build(self.matrix, n_probe=n_probe)
+            if path is not None:
+                index.save(path, fingerprint)
+        self.index = index
+        self.rerank_k = rerank_k
+        return index
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    def distances(self, face_encodings):
+        """Return the (M, N) euclidean distance matrix for M probe encodings."""
+        probes = np.asarray(face_encodings, dtype=np.float32).reshape(-1, ENCODING_DIM)
+        probe_sq = np.einsum("ij,ij->i", probes, probes)
+        # |a - b|^2 = |a|^2 + |b|^2 - 2ab, clipped against float32 round-off
+        d2 = probe_sq[:, None] + self.sq_norms[None, :] - 2.0 * (probes @ self.matrix.T)
+        return np.sqrt(np.maximum(d2, 0.0))
+
+    def match(self, face_encodings):
+        """Match all encodings of a frame at once.
+
+        Returns one Match per probe with the best gallery index, its
+        distance and whether it falls within the tolerance.
+        """
+        probes = np.asarray(face_encodings, dtype=np.float32).reshape(-1, ENCODING_DIM)
+        if len(probes) == 0:
+            return []
+        if len(self) == 0:
+            return [NO_MATCH] * len(probes)
+        if self.index is not None:
+            return self._match_indexed(probes)
+
+        best = np.argmin(self.distances(probes), axis=1)
+        # Recompute the winning distances exactly so results right at the
+        # tolerance agree with face_recognition.face_distance
+        best_dist = np.linalg.norm(
+            probes.astype(np.float64) - self.matrix[best].astype(np.float64), axis=1
+        )
+        return [self._result(idx, dist) for idx, dist in zip(best.tolist(), best_dist.tolist())]
+
+    def _match_indexed(self, probes):
+        results = []
+        for probe, (candidates, _) in zip(probes, self.index.search(self.matrix, probes, self.rerank_k)):
+            if len(candidates) == 0:
+                results.append(NO_MATCH)
+                continue
+            # Exact re-rank of the shortlisted candidates
+            exact = np.linalg.norm(
+                self.matrix[candidates].astype(np.float64) - probe.astype(np.float64), axis=1
+            )
+            best = int(np.argmin(exact))
+            results.append(self._result(int(candidates[best]), float(exact[best])))
+        return results
+
+    def _result(self, idx, dist):
+        return Match(idx, self.ids[idx], self.names[idx], dist, dist <= self.tolerance)
+
+
+_unit_galleries = {}
+_cached_version = None
+
+
+def get_unit_gallery(unit_id, tolerance=DEFAULT_TOLERANCE, fallback=FALLBACK_TO_FULL_GALLERY):
+    """Return the cached gallery of students enrolled in a unit.
+
+    Falls back to the full gallery when the unit has no enrolled faces and
+    fallback is enabled.
+    """
+    global _cached_version
+    # Edits from other processes (e.g. bulk enrolment) move the change
+    # counters, which drops every cached gallery; unit assignments have
+    # their own counter
+    version = (gallery_version(), roster_version())
+    if version != _cached_version:
+        _unit_galleries.clear()
+        _cached_version = version
+
+    key = (unit_id, tolerance, fallback)
+    gallery = _unit_galleries.get(key)
+    if gallery is None:
+        ids, names, encodings = load_unit_encodings(unit_id)
+        # Classes are small enough that a brute-force scan always wins
+        gallery = FaceGallery(ids, names, encodings, tolerance)
+        if not len(gallery) and fallback:
+            print(f"[INFO] No enrolled faces for unit {unit_id}, using full gallery.")
+            gallery = FaceGallery.from_database(tolerance)
+        _unit_galleries[key] = gallery
+    return gallery
+
+
+def invalidate_galleries():
+    """Drop cached unit galleries after students or enrolments change."""
+    _unit_galleries.clear()
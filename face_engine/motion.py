@@ -0,0 +1,56 @@
+import cv2
+
+# Frames are compared at this size; enough to see a person walk in
+GATE_SIZE = (80, 60)
+# Per-pixel intensity change that counts as motion
+PIXEL_THRESHOLD = 25
+# Fraction of changed pixels needed to wake face detection
+MOTION_THRESHOLD = 0.01
+# How fast the background model absorbs slow lighting changes
+BACKGROUND_RATE = 0.05
+
+
+class MotionGate:
+    """Cheap background-subtraction check in front of HOG face detection.
+
+    A running-average background is kept at a tiny resolution. Detection
+    only runs when enough pixels differ from it, so an empty doorway costs
+    a resize and a subtraction per frame instead of a HOG pass.
+    """
+
+    def __init__(self, threshold=MOTION_THRESHOLD, pixel_threshold=PIXEL_THRESHOLD,
+                 background_rate=BACKGROUND_RATE):
+        self.threshold = threshold
+        self.pixel_threshold = pixel_threshold
+        self.background_rate = background_rate
+        self.background = None
+        self.checked = 0
+        self.skipped = 0
+
+    def motion_level(self, frame):
+        """Fraction of pixels that changed against the background model."""
+        gray = cv2.cvtColor(cv2.resize(frame, GATE_SIZE), cv2.COLOR_BGR2GRAY)
+        gray = cv2.GaussianBlur(gray, (5, 5), 0).astype("float32")
+        if self.background is None:
+            self.background = gray
+            return 1.0
+        diff = cv2.absdiff(gray, self.background)
+        cv2.accumulateWeighted(gray, self.background, self.background_rate)
+        changed = cv2.countNonZero(cv2.threshold(diff, self.pixel_threshold, 255, cv2.THRESH_BINARY)[1])
+        return changed / float(diff.size)
+
+    def should_detect(self, frame):
+        self.checked += 1
+        if self.motion_level(frame) >= self.threshold:
+            return True
+        self.skipped += 1
+        return False
+
+    @property
+    def skip_ratio(self):
+        return self.skipped / self.checked if self.checked else 0.0
+
+    def reset(self):
+        self.background = None
+        self.checked = 0
+        self.skipped = 0
@@ -0,0 +1,59 @@
+import time
+import cv2
+
+# How long a confirmation stays on screen after a mark
+CONFIRM_SECONDS = 2.5
+CONFIRM_COLOR = (0, 200, 0)
+
+
+class ConfirmationOverlay:
+    """Timed "attendance marked" annotations drawn on later frames.
+
+    A confirmation is tied to a tracker ID, so it follows that face while
+    recognition keeps running and several students can be confirmed at
+    once. Confirmations whose face has left the frame are listed in the
+    corner until they expire.
+    """
+
+    def __init__(self, duration=CONFIRM_SECONDS):
+        self.duration = duration
+        # track_id -> (name, expiry on the monotonic clock)
+        self._active = {}
+
+    def confirm(self, track_id, name, now=None):
+        now = time.monotonic() if now is None else now
+        self._active[track_id] = (name, now + self.duration)
+
+    def _prune(self, now):
+        self._active = {tid: entry for tid, entry in self._active.items() if entry[1] > now}
+
+    def __len__(self):
+        self._prune(time.monotonic())
+        return len(self._active)
+
+    def draw(self, frame, tracks, now=None):
+        """Annotate frame in place; tracks are this frame's FaceTracker tracks."""
+        now = time.monotonic() if now is None else now
+        self._prune(now)
+        if not self._active:
+            return frame
+
+        visible = set()
+        for track in tracks:
+            entry = self._active.get(track.track_id)
+            if entry is None:
+                continue
+            visible.add(track.track_id)
+            top, right, bottom, left = track.box
+            cv2.rectangle(frame, (left, top), (right, bottom), CONFIRM_COLOR, 3)
+            cv2.putText(frame, "Attendance marked", (left, bottom + 22),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, CONFIRM_COLOR, 2)
+
+        y = 30
+        for track_id, (name, _) in self._active.items():
+            if track_id in visible:
+                continue
+            cv2.putText(frame, f"Marked: {name}", (10, y), cv2.FONT_HERSHEY_SIMPLEX,
+                        0.7, CONFIRM_COLOR, 2)
+            y += 28
+        return frame
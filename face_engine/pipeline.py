@@ -0,0 +1,164 @@
+import threading
+import time
+from collections import namedtuple
+
+import cv2
+import face_recognition
+from PyQt5.QtCore import QThread, pyqtSignal
+from face_engine.detection import FaceDetector
+from face_engine.motion import MotionGate
+from face_engine.scheduler import AdaptiveScheduler
+from face_engine.tracker import FaceTracker
+from metrics import count
+
+# Frame size used for display and the motion gate
+PROCESS_SIZE = (320, 240)
+
+# locations are in full-frame coordinates; frame is the PROCESS_SIZE preview
+RecognitionResult = namedtuple("RecognitionResult", ["seq", "frame", "locations", "matches", "track_ids"])
+
+
+class FrameGrabber(threading.Thread):
+    """Reads the camera continuously and keeps only the newest frame.
+
+    Older frames are overwritten rather than queued, so consumers always
+    work on what the camera sees now.
+    """
+
+    def __init__(self, video, scheduler=None):
+        super().__init__(daemon=True)
+        self.video = video
+        self.scheduler = scheduler or AdaptiveScheduler()
+        self._lock = threading.Lock()
+        self._frame = None
+        self._seq = 0
+        self._running = threading.Event()
+        self._running.set()
+
+    def run(self):
+        while self._running.is_set():
+            with self.scheduler.measure("read"):
+                ret, frame = self.video.read()
+            if not ret:
+                time.sleep(0.01)
+                continue
+            with self._lock:
+                self._frame = frame
+                self._seq += 1
+            count("frames_captured")
+
+    def latest(self):
+        """Return (sequence number, frame) of the newest captured frame."""
+        with self._lock:
+            return self._seq, self._frame
+
+    def stop(self):
+        self._running.clear()
+        if self.is_alive():
+            self.join(timeout=1.0)
+
+
+class RecognitionWorker(QThread):
+    """Runs detection, encoding and matching off the GUI thread.
+
+    Each pass takes the newest frame from the grabber; frames that arrived
+    while dlib was busy are counted in `dropped` and never processed.
+    Results are delivered to the GUI through the results_ready signal.
+    """
+
+    results_ready = pyqtSignal(object)
+
+    def __init__(self, grabber, gallery, pool=None, scheduler=None, parent=None):
+        super().__init__(parent)
+        self.grabber = grabber
+        self.scheduler = scheduler or grabber.scheduler
+        self.gallery = gallery
+        # Optional EncodingPool; when set, faces are encoded in parallel
+        self.pool = pool
+        self.tracker = FaceTracker()
+        self.motion_gate = MotionGate()
+        self.detector = FaceDetector()
+        self.encoded = 0
+        self.processed = 0
+        self.dropped = 0
+
+    def run(self):
+        last_seq = 0
+        while not self.isInterruptionRequested():
+            seq, frame = self.grabber.latest()
+            if frame is None or seq == last_seq:
+                self.msleep(5)
+                continue
+            if last_seq:
+                self.dropped += seq - last_seq - 1
+                count("frames_dropped", seq - last_seq - 1)
+            last_seq = seq
+
+            try:
+                result = self.process(seq, frame)
+            except Exception as e:
+                print(f"[ERROR] Recognition failed: {e}")
+                continue
+            if result is not None:
+                self.processed += 1
+                self.scheduler.recognition_done(len(result.locations))
+                self.results_ready.emit(result)
+            self.pause(self.scheduler.recognition_delay())
+
+    def stats(self):
+        return {
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "encoded": self.encoded,
+            "motion_skip_ratio": round(self.motion_gate.skip_ratio, 3),
+        }
+
+    def pause(self, seconds):
+        """Sleep between passes while staying responsive to stop requests"""
+        deadline = time.monotonic() + seconds
+        while not self.isInterruptionRequested() and time.monotonic() < deadline:
+            self.msleep(10)
+
+    def process(self, seq, frame):
+        """Run one recognition pass; returns None when the scene is static."""
+        small_frame = cv2.resize(frame, PROCESS_SIZE)
+        if not self.motion_gate.should_detect(small_frame):
+            return None
+        self.scheduler.activity()
+
+        # Detection and encoding work on the full-resolution frame; boxes
+        # come back in full-frame coordinates
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        with self.scheduler.measure("detect"):
+            locations = self.detector.detect(rgb_frame)
+        count("faces_detected", len(locations))
+        tracks = self.tracker.update(locations)
+
+        # Only faces the tracker has not identified yet are encoded
+        pending = [i for i, track in enumerate(tracks) if self.tracker.needs_encoding(track)]
+        if pending:
+            pending_locations = [locations[i] for i in pending]
+            if self.pool is not None:
+                # Workers encode and match together
+                with self.scheduler.measure("encode"):
+                    matches = self.pool.match_faces(rgb_frame, pending_locations)
+            else:
+                with self.scheduler.measure("encode"):
+                    encodings = face_recognition.face_encodings(rgb_frame, pending_locations)
+                with self.scheduler.measure("match"):
+                    matches = self.gallery.match(encodings)
+            for i, match in zip(pending, matches):
+                self.tracker.set_match(tracks[i], match)
+            self.encoded += len(pending)
+            count("faces_encoded", len(pending))
+
+        return RecognitionResult(
+            seq, small_frame, locations,
+            [track.match for track in tracks],
+            [track.track_id for track in tracks],
+        )
+
+    def stop(self):
+        self.requestInterruption()
+        # A pass in flight finishes first; destroying a running QThread aborts
+        self.wait()
@@ -1,8 +1,12 @@
 import face_recognition
 import cv2
+import hashlib
 import os
 import pickle
-from database.student_db import load_all_encodings, log_attendance
+from database.student_db import (
+    load_all_encodings, log_attendance, update_encodings, delete_students,
+    match_student_ids, student_key,
+)
 import numpy as np
 import warnings
 
@@ -21,35 +25,125 @@ DATASET_DIR = "students"
 ENCODINGS_FILE = "face_engine/encodings.pkl"
 
 
-def encode_faces():
-    known_encodings = []
-    known_names = []
+FACE_SUFFIX = "_face.jpg"
+
+
+def _file_hash(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _iter_face_images(root=DATASET_DIR):
+    """Yield (student_id, path) for every face photo under root, recursively.
+
+    Nested folders are part of the ID: students/INTE/MG/2586/09/22_face.jpg
+    belongs to INTE/MG/2586/09/22, matching how photos are saved.
+    """
+    for dirpath, _, files in os.walk(root):
+        for file in files:
+            if file.endswith(FACE_SUFFIX):
+                path = os.path.join(dirpath, file)
+                rel = os.path.relpath(path, root).replace(os.sep, "/")
+                yield rel[:-len(FACE_SUFFIX)], path
+
 
+def _load_encode_cache():
+    if not os.path.exists(ENCODINGS_FILE):
+        return {}
+    try:
+        with open(ENCODINGS_FILE, "rb") as f:
+            return pickle.load(f).get("cache", {})
+    except Exception as e:
+        print(f"[WARNING] Ignoring unreadable encodings cache: {e}")
+        return {}
+
+
+def encode_faces(sync_db=False):
+    """Incrementally encode every face photo under students/.
+
+    Each image is cached by path, size, mtime and content hash, so only new
+    or changed photos go through dlib. Photos that disappeared are dropped
+    from encodings.pkl. With sync_db, changed encodings are written to the
+    students table and students with no photo left at all are deleted.
+    Returns (encoded, unchanged, removed student IDs).
+    """
     if not os.path.exists(DATASET_DIR):
         os.makedirs(DATASET_DIR)
 
-    for file in os.listdir(DATASET_DIR):
-        if file.endswith("_face.jpg"):
-            path = os.path.join(DATASET_DIR, file)
-            name = file.replace("_face.jpg", "")
-            img = face_recognition.load_image_file(path)
-            encodings = face_recognition.face_encodings(img)
-            if encodings:
-                known_encodings.append(encodings[0])
-                known_names.append(name)
-                print(f"[INFO] Encoded: {name}")
-            else:
-                print(f"[WARNING] No face found in {file}")
-
-    data = {"encodings": known_encodings, "names": known_names}
-    with open(ENCODINGS_FILE, "wb") as f:
+    cache = _load_encode_cache()
+    new_cache = {}
+    changed = []
+    reused = 0
+
+    for student_id, path in _iter_face_images():
+        stat = os.stat(path)
+        entry = cache.get(path)
+        if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime_ns:
+            new_cache[path] = entry
+            reused += 1
+            continue
+
+        digest = _file_hash(path)
+        if entry and entry["sha1"] == digest:
+            # Touched but identical; keep the encoding, refresh the stat
+            entry = dict(entry, size=stat.st_size, mtime=stat.st_mtime_ns)
+            new_cache[path] = entry
+            reused += 1
+            continue
+
+        img = face_recognition.load_image_file(path)
+        encodings = face_recognition.face_encodings(img)
+        encoding = encodings[0] if encodings else None
+        if encoding is not None:
+            changed.append((student_id, encoding))
+            print(f"[INFO] Encoded: {student_id}")
+        else:
+            print(f"[WARNING] No face found in {path}")
+        new_cache[path] = {"id": student_id, "size": stat.st_size, "mtime": stat.st_mtime_ns,
+                           "sha1": digest, "encoding": encoding}
+
+    # A student is only gone when no photo of theirs is left; one path
+    # vanishing (a rename, a second photo removed) is not a deletion
+    remaining = {student_key(entry["id"]) for entry in new_cache.values()}
+    removed = sorted({entry["id"] for path, entry in cache.items()
+                      if path not in new_cache and student_key(entry["id"]) not in remaining})
+
+    known_encodings = []
+    known_names = []
+    for entry in new_cache.values():
+        if entry["encoding"] is not None:
+            known_encodings.append(entry["encoding"])
+            known_names.append(entry["id"])
+
+    data = {"encodings": known_encodings, "names": known_names, "cache": new_cache}
+    with open(ENCODINGS_FILE + ".tmp", "wb") as f:
         pickle.dump(data, f)
-    print("[INFO] Face encodings saved!")
+    os.replace(ENCODINGS_FILE + ".tmp", ENCODINGS_FILE)
+
+    if sync_db:
+        # Photo paths may differ in case from the IDs students were saved under
+        stored = match_student_ids([sid for sid, _ in changed] + removed)
+        updates = [(stored[sid], encoding) for sid, encoding in changed if sid in stored]
+        for sid, _ in changed:
+            if sid not in stored:
+                print(f"[WARNING] No enrolled student for {sid}; encoding not saved.")
+        if updates:
+            update_encodings(updates)
+        deleted = [stored[sid] for sid in removed if sid in stored]
+        if deleted:
+            delete_students(deleted)
+
+    print(f"[INFO] Face encodings saved! {len(changed)} encoded, {reused} unchanged, "
+          f"{len(removed)} removed.")
+    return len(changed), reused, removed
 
 
 def recognize_face_live():
     ids, names, encodings = load_all_encodings()
-    if not encodings:
+    if not len(encodings):
         print("[ERROR] No students in database.")
         return
 
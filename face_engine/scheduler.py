@@ -0,0 +1,121 @@
+import time
+from contextlib import contextmanager
+from metrics import observe
+
+STAGES = ("read", "detect", "encode", "match", "render")
+
+TARGET_UI_FPS = 25
+# Seconds from a face appearing to it being recognised
+TARGET_LATENCY = 0.5
+MAX_INTERVAL = 1.0
+# With no faces (or motion) for IDLE_AFTER seconds, recognition drops to
+# one pass every IDLE_INTERVAL seconds
+IDLE_AFTER = 10.0
+IDLE_INTERVAL = 1.0
+
+
+class Ewma:
+    """Exponentially weighted moving average of a latency in seconds."""
+
+    def __init__(self, alpha=0.2):
+        self.alpha = alpha
+        self.value = None
+
+    def add(self, sample):
+        if self.value is None:
+            self.value = sample
+        else:
+            self.value += self.alpha * (sample - self.value)
+        return self.value
+
+    def get(self, default=0.0):
+        return default if self.value is None else self.value
+
+
+class AdaptiveScheduler:
+    """Sets recognition cadence and display rate from measured stage latency.
+
+    The display rate aims for target_ui_fps. Recognition runs as often as
+    it can without starving the display: the gap between passes grows when
+    the UI falls behind and shrinks when there is headroom, capped so a
+    face is still recognised within target_latency. When nothing has been
+    seen for a while, recognition idles.
+    """
+
+    def __init__(self, target_ui_fps=TARGET_UI_FPS, target_latency=TARGET_LATENCY,
+                 max_interval=MAX_INTERVAL, idle_after=IDLE_AFTER, idle_interval=IDLE_INTERVAL):
+        self.target_ui_fps = target_ui_fps
+        self.target_latency = target_latency
+        self.max_interval = max_interval
+        self.idle_after = idle_after
+        self.idle_interval = idle_interval
+        self.stages = {name: Ewma() for name in STAGES}
+        self.ui_fps = Ewma(alpha=0.1)
+        self.interval = 0.0
+        self.last_activity = time.monotonic()
+        self._last_render = None
+
+    @contextmanager
+    def measure(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def record(self, stage, seconds):
+        """Feed a stage timing to the cadence EWMA and the metrics histograms."""
+        self.stages[stage].add(seconds)
+        observe(stage, seconds)
+
+    def pass_cost(self):
+        """Average seconds spent on one detect + encode + match pass."""
+        return sum(self.stages[name].get() for name in ("detect", "encode", "match"))
+
+    def frame_rendered(self):
+        now = time.monotonic()
+        if self._last_render is not None and now > self._last_render:
+            self.ui_fps.add(1.0 / (now - self._last_render))
+        self._last_render = now
+
+    def activity(self):
+        """Note that faces or motion were seen, keeping recognition awake."""
+        self.last_activity = time.monotonic()
+
+    def is_idle(self):
+        return time.monotonic() - self.last_activity > self.idle_after
+
+    def recognition_done(self, face_count):
+        if face_count:
+            self.activity()
+
+        fps = self.ui_fps.get(default=self.target_ui_fps)
+        if fps < 0.9 * self.target_ui_fps:
+            # The display is starving; back off multiplicatively
+            self.interval = max(self.interval * 1.5, 0.02)
+        elif fps >= 0.97 * self.target_ui_fps:
+            self.interval = max(0.0, self.interval * 0.8 - 0.005)
+
+        # Average wait for a new face is half the gap plus one pass
+        latency_cap = max(0.0, 2.0 * (self.target_latency - self.pass_cost()))
+        if fps >= 0.9 * self.target_ui_fps:
+            self.interval = min(self.interval, latency_cap)
+        self.interval = min(self.interval, self.max_interval)
+
+    def recognition_delay(self):
+        """Seconds the recognition worker should wait before its next pass."""
+        if self.is_idle():
+            return max(self.interval, self.idle_interval)
+        return self.interval
+
+    def display_interval_ms(self):
+        target = 1.0 / self.target_ui_fps
+        # Never schedule renders faster than they can be drawn
+        render = self.stages["render"].get() * 1.2
+        return int(max(target, render) * 1000)
+
+    def summary(self):
+        summary = {name: round(ewma.get() * 1000, 1) for name, ewma in self.stages.items()}
+        summary["ui_fps"] = round(self.ui_fps.get(), 1)
+        summary["interval_ms"] = round(self.recognition_delay() * 1000)
+        return summary
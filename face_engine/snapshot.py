@@ -0,0 +1,76 @@
+import glob
+import json
+import os
+import numpy as np
+from database.student_db import ENCODING_DIM, gallery_version, load_all_encodings
+
+SNAPSHOT_DIR = "face_engine/snapshot"
+INDEX_FILE = os.path.join(SNAPSHOT_DIR, "index.json")
+
+
+def load_snapshot(version):
+    """Memory-map the snapshot for a gallery version.
+
+    Returns (ids, names, matrix, path), or None if the snapshot is missing
+    or was taken at a different version.
+    """
+    try:
+        with open(INDEX_FILE, "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if index.get("version") != version:
+        return None
+
+    path = os.path.join(SNAPSHOT_DIR, index["matrix"])
+    try:
+        matrix = np.load(path, mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+    if matrix.shape != (len(index["ids"]), ENCODING_DIM):
+        return None
+    return index["ids"], index["names"], matrix, path
+
+
+def write_snapshot(version, ids, names, encodings):
+    """Write the .npy matrix and its ID/name index; returns the matrix path."""
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    matrix_name = f"encodings.v{version}.npy"
+    path = os.path.join(SNAPSHOT_DIR, matrix_name)
+    with open(path + ".tmp", "wb") as f:
+        np.save(f, np.asarray(encodings, dtype=np.float32).reshape(-1, ENCODING_DIM))
+    os.replace(path + ".tmp", path)
+
+    # The index is replaced last so readers never see it point at a
+    # half-written matrix
+    with open(INDEX_FILE + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"version": version, "matrix": matrix_name, "ids": list(ids), "names": list(names)}, f)
+    os.replace(INDEX_FILE + ".tmp", INDEX_FILE)
+
+    for old in glob.glob(os.path.join(SNAPSHOT_DIR, "encodings.v*.npy")):
+        if old != path:
+            try:
+                os.remove(old)
+            except OSError:
+                # Still mapped by another process (Windows); removed next time
+                pass
+    return path
+
+
+def load_gallery_arrays():
+    """Return (ids, names, matrix, path) for the full gallery.
+
+    The matrix is memory-mapped from the snapshot, which is rebuilt from
+    the database only when the gallery change counter has moved.
+    """
+    # Read the version before the rows: a concurrent change then only makes
+    # the snapshot look stale, never fresher than it is
+    version = gallery_version()
+    snapshot = load_snapshot(version)
+    if snapshot is not None:
+        return snapshot
+
+    print(f"[INFO] Rebuilding gallery snapshot (version {version})...")
+    ids, names, encodings = load_all_encodings()
+    path = write_snapshot(version, ids, names, encodings)
+    return ids, names, np.load(path, mmap_mode="r"), path
@@ -0,0 +1,100 @@
+from face_engine.gallery import NO_MATCH
+
+# Minimum overlap for a detection to continue an existing track
+IOU_THRESHOLD = 0.3
+# Detection passes a track survives without being seen
+MAX_MISSES = 5
+# Passes before an identified face is encoded again to confirm identity
+REENCODE_AFTER = 50
+# Passes between retries for a face that did not match anyone yet
+RETRY_UNKNOWN_AFTER = 3
+
+
+def iou(a, b):
+    """Intersection over union of two (top, right, bottom, left) boxes."""
+    top, bottom = max(a[0], b[0]), min(a[2], b[2])
+    left, right = max(a[3], b[3]), min(a[1], b[1])
+    if bottom <= top or right <= left:
+        return 0.0
+    inter = (bottom - top) * (right - left)
+    area_a = (a[2] - a[0]) * (a[1] - a[3])
+    area_b = (b[2] - b[0]) * (b[1] - b[3])
+    return inter / float(area_a + area_b - inter)
+
+
+class Track:
+    def __init__(self, track_id, box):
+        self.track_id = track_id
+        self.box = box
+        self.match = NO_MATCH
+        self.misses = 0
+        # Pass number of the last encoding; None until first encoded
+        self.encoded_at = None
+
+
+class FaceTracker:
+    """Associates HOG detections across passes so each person keeps a track ID.
+
+    Only tracks that are new, still unidentified or due for a periodic
+    re-check need the expensive 128-d encoding.
+    """
+
+    def __init__(self, iou_threshold=IOU_THRESHOLD, max_misses=MAX_MISSES,
+                 reencode_after=REENCODE_AFTER, retry_unknown_after=RETRY_UNKNOWN_AFTER):
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.reencode_after = reencode_after
+        self.retry_unknown_after = retry_unknown_after
+        self.tracks = []
+        self.passes = 0
+        self._next_id = 1
+
+    def update(self, boxes):
+        """Associate this pass's boxes with tracks; returns one track per box."""
+        self.passes += 1
+        pairs = []
+        for t_idx, track in enumerate(self.tracks):
+            for b_idx, box in enumerate(boxes):
+                overlap = iou(track.box, box)
+                if overlap >= self.iou_threshold:
+                    pairs.append((overlap, t_idx, b_idx))
+        pairs.sort(reverse=True)
+
+        assigned = [None] * len(boxes)
+        used_tracks = set()
+        for _, t_idx, b_idx in pairs:
+            if t_idx in used_tracks or assigned[b_idx] is not None:
+                continue
+            track = self.tracks[t_idx]
+            track.box = boxes[b_idx]
+            track.misses = 0
+            assigned[b_idx] = track
+            used_tracks.add(t_idx)
+
+        for t_idx, track in enumerate(self.tracks):
+            if t_idx not in used_tracks:
+                track.misses += 1
+        self.tracks = [t for t in self.tracks if t.misses <= self.max_misses]
+
+        for b_idx, box in enumerate(boxes):
+            if assigned[b_idx] is None:
+                track = Track(self._next_id, box)
+                self._next_id += 1
+                self.tracks.append(track)
+                assigned[b_idx] = track
+        return assigned
+
+    def needs_encoding(self, track):
+        if track.encoded_at is None:
+            return True
+        age = self.passes - track.encoded_at
+        if track.match.accepted:
+            return age >= self.reencode_after
+        return age >= self.retry_unknown_after
+
+    def set_match(self, track, match):
+        track.match = match
+        track.encoded_at = self.passes
+
+    def reset(self):
+        self.tracks = []
@@ -0,0 +1,94 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import face_recognition
+import numpy as np
+from face_engine.ann_index import DEFAULT_RERANK_K
+from face_engine.gallery import FaceGallery, NO_MATCH
+
+# Extra context around each detected box so dlib's landmark model sees the
+# whole face inside the crop
+CROP_MARGIN = 0.25
+
+# Per-process gallery view, set up once by _init_worker
+_worker_shm = None
+_worker_gallery = None
+
+
+def _init_worker(source, shape, ids, names, tolerance, index=None, rerank_k=DEFAULT_RERANK_K):
+    global _worker_shm, _worker_gallery
+    if source.endswith(".npy"):
+        # Snapshot file: every process maps the same page-cache pages
+        matrix = np.load(source, mmap_mode="r")
+    else:
+        _worker_shm = shared_memory.SharedMemory(name=source)
+        matrix = np.ndarray(shape, dtype=np.float32, buffer=_worker_shm.buf)
+    _worker_gallery = FaceGallery(ids, names, matrix, tolerance)
+    # The parent's IVF index arrives pickled; without one the worker
+    # matches exactly
+    _worker_gallery.index = index
+    _worker_gallery.rerank_k = rerank_k
+
+
+def _encode_and_match(crop, box):
+    encodings = face_recognition.face_encodings(crop, [box])
+    if not encodings:
+        return NO_MATCH
+    return _worker_gallery.match(encodings)[0]
+
+
+def crop_face(rgb_frame, location, margin=CROP_MARGIN):
+    """Cut a face out of the frame; returns the crop and the box inside it."""
+    top, right, bottom, left = location
+    pad_y = int((bottom - top) * margin)
+    pad_x = int((right - left) * margin)
+    height, width = rgb_frame.shape[:2]
+    y0, y1 = max(0, top - pad_y), min(height, bottom + pad_y)
+    x0, x1 = max(0, left - pad_x), min(width, right + pad_x)
+    crop = np.ascontiguousarray(rgb_frame[y0:y1, x0:x1])
+    return crop, (top - y0, right - x0, bottom - y0, left - x0)
+
+
+class EncodingPool:
+    """Process pool that encodes and matches face crops in parallel.
+
+    Workers map the gallery once at start-up, either straight from the
+    snapshot file or from a shared memory copy for unit galleries, and get a
+    copy of the gallery's ANN index when it has one (built in memory or
+    loaded from disk alike), so only the small face crops travel with each
+    task.
+    """
+
+    def __init__(self, gallery, workers=None):
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        matrix = gallery.matrix
+        self._shm = None
+        if gallery.snapshot_path:
+            source = gallery.snapshot_path
+        else:
+            self._shm = shared_memory.SharedMemory(create=True, size=max(matrix.nbytes, 1))
+            shared = np.ndarray(matrix.shape, dtype=np.float32, buffer=self._shm.buf)
+            shared[:] = matrix
+            source = self._shm.name
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(source, matrix.shape, gallery.ids, gallery.names, gallery.tolerance,
+                      gallery.index, gallery.rerank_k),
+        )
+        print(f"[INFO] Encoding pool started with {self.workers} workers.")
+
+    def match_faces(self, rgb_frame, locations):
+        """Encode and match every detected face, one task per face."""
+        futures = [
+            self._pool.submit(_encode_and_match, *crop_face(rgb_frame, location))
+            for location in locations
+        ]
+        return [future.result() for future in futures]
+
+    def close(self):
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
@@ -4,7 +4,8 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtGui import QFont, QPixmap, QIcon, QColor, QLinearGradient, QPainter
 from PyQt5.QtCore import Qt, QSize, QRect
-import sqlite3
+from database.connection import get_connection
+from database.student_db import init_db
 from datetime import datetime
 
 
@@ -129,19 +130,19 @@ class DashboardWindow(QWidget):
         card_layout = QHBoxLayout()
         card_layout.setSpacing(18)
 
-        conn = sqlite3.connect("database/students.db")
+        init_db()
+        conn = get_connection()
         cur = conn.cursor()
         cur.execute("SELECT COUNT(*) FROM students")
         total_students = cur.fetchone()[0]
         cur.execute("SELECT COUNT(*) FROM units")
         total_units = cur.fetchone()[0]
         today = datetime.now().strftime('%Y-%m-%d')
-        cur.execute("SELECT COUNT(*) FROM attendance WHERE DATE(timestamp)=?", (today,))
+        cur.execute("SELECT COUNT(*) FROM attendance WHERE attendance_date=?", (today,))
         attendance_today = cur.fetchone()[0]
         cur.execute("SELECT unit_name FROM units LIMIT 1")
         active_unit = cur.fetchone()
         active_unit = active_unit[0] if active_unit else "None"
-        conn.close()
 
         def create_professional_card(icon, title, value):
             card = QFrame()
@@ -207,11 +208,10 @@ class DashboardWindow(QWidget):
         def clear_attendance():
             reply = QMessageBox.question(self.attendance_window, "Confirm Clear", "Are you sure you want to clear all attendance records? This cannot be undone.", QMessageBox.Yes | QMessageBox.No)
             if reply == QMessageBox.Yes:
-                conn = sqlite3.connect("database/students.db")
+                conn = get_connection()
                 cur = conn.cursor()
                 cur.execute("DELETE FROM attendance")
                 conn.commit()
-                conn.close()
                 QMessageBox.information(self.attendance_window, "Cleared", "All attendance records have been cleared.")
                 # Optionally refresh the attendance view if it supports it
         clear_btn.clicked.connect(clear_attendance)
@@ -224,13 +224,12 @@ class DashboardWindow(QWidget):
 
     def export_attendance(self):
         import pandas as pd
-        conn = sqlite3.connect("database/students.db")
+        conn = get_connection()
         cur = conn.cursor()
         cur.execute("SELECT student_id, name, timestamp FROM attendance ORDER BY timestamp DESC")
         rows = cur.fetchall()
 
         if not rows:
-            conn.close()
             QMessageBox.information(self, "No Records", "No attendance records found.")
             return
 
@@ -238,8 +237,6 @@ class DashboardWindow(QWidget):
         filename = f"attendance_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
         df.to_excel(filename, index=False)
 
-        conn.close()
-
         QMessageBox.information(self, "Exported", f"Attendance exported to {filename}")
 
     def refresh_dashboard(self):
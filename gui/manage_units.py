@@ -5,9 +5,10 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtGui import QFont, QPixmap
 from PyQt5.QtCore import Qt
-import sqlite3
+from database.connection import get_connection
 import json
 import os
+from face_engine.gallery import invalidate_galleries
 
 # Helper to create a student card with profile image
 def create_student_card(student_id, name):
@@ -37,7 +38,7 @@ class ManageUnitsWindow(QWidget):
         self.setGeometry(200, 100, 700, 600)
         # self.setStyleSheet("background-color: #f8f9fa;")
 
-        self.conn = sqlite3.connect("database/students.db")
+        self.conn = get_connection()
         self.ensure_units_table()
         self.ensure_student_units_table()
         self.init_ui()
@@ -289,6 +290,7 @@ class ManageUnitsWindow(QWidget):
                 (sid, unit_id)
             )
         self.conn.commit()
+        invalidate_galleries()
         QMessageBox.information(self, "Saved", "Student assignments updated.")
         dialog.close()
 
@@ -371,5 +373,5 @@ class ManageUnitsWindow(QWidget):
         dlg.show()
 
     def closeEvent(self, a0):
-        self.conn.close()
+        # The connection is shared with the rest of the GUI thread
         super().closeEvent(a0)
@@ -1,5 +1,6 @@
 import face_recognition
 from database.student_db import save_student
+from face_engine.gallery import invalidate_galleries
 import cv2
 import sounddevice as sd
 import scipy.io.wavfile as wav
@@ -172,6 +173,7 @@ class RegisterStudentWindow(QWidget):
             )
             return
         save_student(student_id, name, encodings[0], self.voice_path)
+        invalidate_galleries()
         QMessageBox.information(
             self,
             "Saved",
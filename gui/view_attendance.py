@@ -4,7 +4,7 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtGui import QFont
 from PyQt5.QtCore import Qt
-import sqlite3
+from database.connection import get_connection
 
 class ViewAttendanceWindow(QWidget):
     def __init__(self):
@@ -55,23 +55,21 @@ class ViewAttendanceWindow(QWidget):
         self.load_attendance()
 
     def load_units(self):
-        conn = sqlite3.connect("database/students.db")
+        conn = get_connection()
         cursor = conn.cursor()
         cursor.execute("SELECT id, unit_name, unit_code FROM units")
         self.units = cursor.fetchall()
         self.unit_combo.clear()
         for uid, name, code in self.units:
             self.unit_combo.addItem(f"{name} ({code})", uid)
-        conn.close()
 
     def load_attendance(self):
-        conn = sqlite3.connect("database/students.db")
+        conn = get_connection()
         cursor = conn.cursor()
         unit_index = self.unit_combo.currentIndex()
         if unit_index < 0 or not hasattr(self, 'units') or not self.units:
             self.attendance_data = []
             self.populate_table(self.attendance_data)
-            conn.close()
             return
         unit_id = self.unit_combo.currentData()
         cursor.execute("""
@@ -83,7 +81,6 @@ class ViewAttendanceWindow(QWidget):
             ORDER BY attendance.timestamp DESC
         """, (unit_id,))
         self.attendance_data = cursor.fetchall()
-        conn.close()
         self.populate_table(self.attendance_data)
 
     def populate_table(self, data):
@@ -5,7 +5,8 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtGui import QFont, QPixmap, QIcon
 from PyQt5.QtCore import Qt, QSize
 from database.student_db import load_all_encodings
-import sqlite3
+from face_engine.gallery import invalidate_galleries
+from database.connection import get_connection
 import os
 
 
@@ -53,7 +54,7 @@ class ViewStudentsWindow(QWidget):
     def load_table(self):
         self.table.setRowCount(0)
         ids, names, _ = load_all_encodings()
-        conn = sqlite3.connect("database/students.db")
+        conn = get_connection()
         cursor = conn.cursor()
         self.rows_data = []
 
@@ -68,7 +69,6 @@ class ViewStudentsWindow(QWidget):
                 img_path = f"students/{sid}_face.jpg"
                 self.rows_data.append((sid, name, voice_path, img_path))
 
-        conn.close()
         self.populate_table(self.rows_data)
 
     def populate_table(self, data):
@@ -109,13 +109,13 @@ class ViewStudentsWindow(QWidget):
             QMessageBox.Yes | QMessageBox.No
         )
         if confirm == QMessageBox.Yes:
-            conn = sqlite3.connect("database/students.db")
+            conn = get_connection()
             cursor = conn.cursor()
             cursor.execute(
                 "DELETE FROM students WHERE student_id = ?", (student_id,)
             )
             conn.commit()
-            conn.close()
+            invalidate_galleries()
 
             # Remove files
             face_path = f"students/{student_id}_face.jpg"
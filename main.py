@@ -2,13 +2,9 @@ from PyQt5.QtWidgets import QApplication
 from gui.splash import SplashScreen
 from gui.login import LoginWindow
 from theme_manager import apply_theme
+import multiprocessing
 import sys
 
-app = QApplication(sys.argv)
-
-# Apply light theme on startup
-apply_theme("light")
-
 
 def show_login():
     global login_window
@@ -16,7 +12,16 @@ def show_login():
     login_window.show()
 
 
-splash = SplashScreen()
-splash.start(show_login)
+# Guarded so recognition worker processes can re-import this module safely
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+
+    app = QApplication(sys.argv)
+
+    # Apply light theme on startup
+    apply_theme("light")
+
+    splash = SplashScreen()
+    splash.start(show_login)
 
-sys.exit(app.exec_())
+    sys.exit(app.exec_())
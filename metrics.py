@@ -0,0 +1,150 @@
+"""In-process timers, counters and rolling latency histograms.
+
+Hot paths wrap their work in `timer("stage")` and bump `count("event")`.
+Recording a sample is a lock, a deque append and two additions, cheap
+enough for every frame. `snapshot()` summarises the recent window for the
+attendance overlay, and MetricsDumper appends it to metrics/<day>.jsonl
+so a "laggy camera" report can be looked at afterwards.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+METRICS_DIR = "metrics"
+# Samples kept per histogram; percentiles describe roughly the last minute
+WINDOW = 2048
+DUMP_INTERVAL = 30.0
+
+
+class Histogram:
+    """Latency samples over a rolling window, plus lifetime totals."""
+
+    def __init__(self, window=WINDOW):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q, ordered=None):
+        ordered = ordered if ordered is not None else sorted(self.samples)
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(q / 100.0 * len(ordered)))]
+
+    def summary(self):
+        ordered = sorted(self.samples)
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count * 1000, 2) if self.count else 0.0,
+            "p50_ms": round(self.percentile(50, ordered) * 1000, 2),
+            "p95_ms": round(self.percentile(95, ordered) * 1000, 2),
+            "p99_ms": round(self.percentile(99, ordered) * 1000, 2),
+            "max_ms": round(self.max * 1000, 2),
+        }
+
+
+class Metrics:
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self.enabled = True
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._started = time.time()
+
+    def observe(self, name, seconds):
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram(self.window)
+            histogram.add(seconds)
+
+    @contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def count(self, name, n=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def histogram(self, name):
+        """Summary of one stage, or None if it has never been timed."""
+        with self._lock:
+            histogram = self._histograms.get(name)
+            return histogram.summary() if histogram else None
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "uptime_s": round(time.time() - self._started, 1),
+                "timers": {name: h.summary() for name, h in sorted(self._histograms.items())},
+                "counters": dict(sorted(self._counters.items())),
+            }
+
+    def dump(self, directory=METRICS_DIR):
+        """Append the current snapshot to today's metrics file."""
+        snapshot = self.snapshot()
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{snapshot['time'][:10]}.jsonl")
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(snapshot) + "\n")
+        return path
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._started = time.time()
+
+
+METRICS = Metrics()
+timer = METRICS.timer
+count = METRICS.count
+observe = METRICS.observe
+
+
+class MetricsDumper(threading.Thread):
+    """Writes a metrics snapshot every `interval` seconds and once on stop."""
+
+    def __init__(self, metrics=METRICS, interval=DUMP_INTERVAL, directory=METRICS_DIR):
+        super().__init__(daemon=True)
+        self.metrics = metrics
+        self.interval = interval
+        self.directory = directory
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self._dump()
+
+    def _dump(self):
+        try:
+            self.metrics.dump(self.directory)
+        except OSError as e:
+            print(f"[WARNING] Could not write metrics: {e}")
+
+    def stop(self):
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout=1.0)
+        self._dump()
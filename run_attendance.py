@@ -5,120 +5,22 @@ import sys
 QApplication.instance() or QApplication(sys.argv)  # noqa: F841, intentional side effect
 
 import cv2
-import face_recognition
-import numpy as np
 import os
-import json
-from datetime import datetime
-from face_engine.recognizer import load_all_encodings
-from database.student_db import log_attendance
-import pyttsx3
-
-
-def speak(text):
-    """Text to speech - speaks the given text"""
-    try:
-        import threading
-        
-        # Run speech in background thread to prevent blocking UI
-        def speak_thread():
-            try:
-                engine = pyttsx3.init(driverName='sapi5')  # Windows SAPI5
-                engine.setProperty('rate', 150)  # Speed
-                engine.setProperty('volume', 0.9)  # Volume
-                engine.say(text)
-                engine.runAndWait()
-            except Exception as e:
-                print(f"[WARNING] Speech error: {e}")
-        
-        # Start speech in background thread
-        thread = threading.Thread(target=speak_thread, daemon=True)
-        thread.start()
-    except Exception as e:
-        print(f"[WARNING] Speech initialization failed: {e}")
-
-
-def listen_for_voice():
-    """Listen to microphone and return recognized text"""
-    try:
-        import speech_recognition as sr
-        
-        recognizer = sr.Recognizer()
-        recognizer.energy_threshold = 4000  # Adjust sensitivity
-        
-        try:
-            with sr.Microphone() as source:
-                # Adjust for ambient noise
-                print("[INFO] Listening... (speak now)")
-                recognizer.adjust_for_ambient_noise(source, duration=1)
-                
-                try:
-                    # Listen with timeout of 5 seconds
-                    audio = recognizer.listen(source, timeout=5, phrase_time_limit=5)
-                except sr.RequestError as e:
-                    # Silently fail - user will get feedback on UI
-                    return None
-                except sr.UnknownValueError:
-                    return None
-        except Exception as e:
-            # Microphone error - return None silently
-            return None
-        
-        # Recognize speech using Google Speech Recognition
-        try:
-            text = recognizer.recognize_google(audio)
-            print(f"[VOICE] Recognized: {text}")
-            return text.lower()
-        except sr.UnknownValueError:
-            # Could not understand - return None
-            return None
-        except sr.RequestError as e:
-            # API error or no internet
-            print(f"[ERROR] Internet/API error: {e}")
-            return None
-            
-    except Exception as e:
-        # Silently fail
-        return None
-
-
-
-
-def already_logged_today(student_id, unit_id):
-    today = datetime.now().strftime("%Y-%m-%d")
-    log_file = "attendance_logs.json"
-    if os.path.exists(log_file):
-        with open(log_file, "r") as f:
-            logs = json.load(f)
-            for log in logs:
-                # Check both student and unit for today
-                if (
-                    log.get("student_id") == student_id and
-                    log.get("unit_id") == unit_id and
-                    log.get("timestamp", "").startswith(today)
-                ):
-                    return True
-    return False
-
-
-def save_to_json_log(student_id, name, unit_id):
-    log_file = "attendance_logs.json"
-    new_log = {
-        "student_id": student_id,
-        "name": name,
-        "unit_id": unit_id,
-        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    }
-    if os.path.exists(log_file):
-        with open(log_file, "r") as f:
-            logs = json.load(f)
-    else:
-        logs = []
-    logs.append(new_log)
-    with open(log_file, "w") as f:
-        json.dump(logs, f, indent=4)
-
-
+import time
+from face_engine.gallery import get_unit_gallery
+from face_engine.pipeline import FrameGrabber, RecognitionWorker, PROCESS_SIZE
+from face_engine.worker_pool import EncodingPool
+from face_engine.scheduler import AdaptiveScheduler
+from face_engine.detection import scale_box
+from database.attendance_writer import get_attendance_writer
+from database.connection import get_connection
+from database.attendance_index import AttendanceIndex
+from database.attendance_log import append_attendance, get_attendance_log
+from metrics import METRICS, MetricsDumper, count
+from voice_engine.tts import speak, announce_mark, PRIORITY_ALERT
+from voice_engine.voice_worker import VoiceAttendanceWorker
+from voice_engine.speech_backends import RosterVocabulary, create_backend
+from voice_engine.roster_index import get_roster_index, MIN_SCORE
 
 
 def start_attendance():
@@ -145,10 +47,9 @@ def start_attendance():
 # Define AttendanceWindow class at module level (outside the function)
 def _create_attendance_window_class():
     """Create the AttendanceWindow class"""
-    from PyQt5.QtWidgets import QApplication, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QPushButton, QMainWindow, QWidget, QMessageBox
+    from PyQt5.QtWidgets import QApplication, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QPushButton, QMainWindow, QWidget, QMessageBox, QCheckBox
     from PyQt5.QtGui import QImage, QPixmap
     from PyQt5.QtCore import Qt, QTimer
-    import sqlite3
 
     class AttendanceWindow(QMainWindow):
         def __init__(self):
@@ -156,10 +57,15 @@ def _create_attendance_window_class():
             self.setWindowTitle("EduScan Attendance - Taking")
             self.setGeometry(100, 100, 1000, 700)
             self.is_running = False
-            self.logged_students = set()
+            self.attendance_index = None
             self.unit_id = None
             self.video = None
             self.timer = None
+            self.grabber = None
+            self.worker = None
+            self.pool = None
+            self.dumper = None
+            self.voice_worker = None
 
             # Main widget
             main_widget = QWidget()
@@ -172,7 +78,7 @@ def _create_attendance_window_class():
             self.unit_combo = QComboBox()
             
             try:
-                conn = sqlite3.connect("database/students.db")
+                conn = get_connection()
                 cursor = conn.cursor()
                 cursor.execute("SELECT id, unit_name, unit_code FROM units")
                 self.units = cursor.fetchall()
@@ -183,13 +89,22 @@ def _create_attendance_window_class():
                 else:
                     for uid, name, code in self.units:
                         self.unit_combo.addItem(f"{name} ({code})", uid)
-                conn.close()
             except Exception as e:
                 QMessageBox.critical(self, "Database Error", f"Failed to load units: {e}")
                 self.close()
                 return
             
             unit_layout.addWidget(self.unit_combo)
+
+            unit_layout.addWidget(QLabel("Recognition:"))
+            self.backend_combo = QComboBox()
+            self.backend_combo.addItem("Single process", "thread")
+            self.backend_combo.addItem(f"Process pool ({max(1, (os.cpu_count() or 2) - 1)} workers)", "pool")
+            unit_layout.addWidget(self.backend_combo)
+
+            self.timings_check = QCheckBox("Show timings")
+            unit_layout.addWidget(self.timings_check)
+
             start_btn = QPushButton("🎥 Start Camera")
             start_btn.clicked.connect(self.start_camera)
             unit_layout.addWidget(start_btn)
@@ -237,24 +152,46 @@ def _create_attendance_window_class():
                     print("❌ Cannot access camera.")
                     return
 
-                self.known_ids, self.known_names, self.known_encodings = load_all_encodings()
+                self.gallery = get_unit_gallery(self.unit_id, tolerance=0.5)
                 
-                if not self.known_encodings:
-                    QMessageBox.warning(self, "No Students", "No student encodings found. Please register students first.")
+                if not len(self.gallery):
+                    QMessageBox.warning(self, "No Students", "No student encodings found for this unit. Please register or assign students first.")
                     print("[WARNING] No student encodings loaded.")
                     self.video.release()
                     return
 
+                self.attendance_index = AttendanceIndex.load()
+
                 # Disable unit selection and enable stop button
                 self.unit_combo.setEnabled(False)
+                self.backend_combo.setEnabled(False)
                 self.stop_btn.setEnabled(True)
                 self.is_running = True
-                self.frame_count = 0  # For frame skipping
-                
-                # Timer for camera updates - reduced from 30ms to 50ms
+                self.last_result = None
+                self.marked_until = 0.0
+
+                # Capture and recognition run on their own threads; the GUI
+                # only renders the newest frame and reacts to results
+                if self.backend_combo.currentData() == "pool":
+                    self.pool = EncodingPool(self.gallery)
+
+                self.scheduler = AdaptiveScheduler()
+                self.grabber = FrameGrabber(self.video, self.scheduler)
+                self.grabber.start()
+                self.worker = RecognitionWorker(self.grabber, self.gallery, self.pool)
+                self.worker.results_ready.connect(self.on_recognition)
+                self.worker.start()
+
+                # Stage timings for this session go to metrics/<day>.jsonl
+                METRICS.reset()
+                self.dumper = MetricsDumper()
+                self.dumper.start()
+
+                # Display timer is independent of how fast recognition runs;
+                # the scheduler retunes its interval from measured render cost
                 self.timer = QTimer()
                 self.timer.timeout.connect(self.update_frame)
-                self.timer.start(50)  # ~20 FPS instead of 33 FPS
+                self.timer.start(self.scheduler.display_interval_ms())
                 print("[INFO] Attendance window started successfully.")
                 # Announce that attendance has started
                 unit_name = self.unit_combo.currentText()
@@ -265,62 +202,65 @@ def _create_attendance_window_class():
                 import traceback
                 traceback.print_exc()
                 self.is_running = False
-                if self.video:
-                    self.video.release()
+                self.shutdown_pipeline()
 
-        def update_frame(self):
-            if not self.is_running or not self.video:
+        def on_recognition(self, result):
+            """Handle a recognition result posted from the worker thread"""
+            if not self.is_running:
                 return
+            self.last_result = result
 
-            try:
-                ret, frame = self.video.read()
-                if not ret:
-                    return
+            for match in result.matches:
+                if not match.accepted:
+                    continue
+                sid = match.student_id
+                name = match.name
 
-                # Optimize: Scale down frame for faster processing
-                small_frame = cv2.resize(frame, (320, 240))
-                rgb_frame = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
-                
-                # Process face recognition only every 5 frames to reduce lag
-                self.frame_count += 1
-                if self.frame_count % 5 == 0:
-                    # Use model='hog' for faster (but less accurate) face detection
-                    face_locations = face_recognition.face_locations(rgb_frame, model='hog')
-                    face_encodings = face_recognition.face_encodings(rgb_frame, face_locations)
-
-                    for face_encoding, face_location in zip(face_encodings, face_locations):
-                        matches = face_recognition.compare_faces(self.known_encodings, face_encoding, tolerance=0.5)
-                        face_distances = face_recognition.face_distance(self.known_encodings, face_encoding)
-
-                        if len(face_distances) == 0:
-                            continue
+                if self.attendance_index.is_marked(sid, self.unit_id):
+                    continue
+
+                # Save attendance
+                get_attendance_writer().submit(sid, name, self.unit_id)
+                append_attendance(sid, name, self.unit_id)
+                self.attendance_index.mark(sid, self.unit_id)
+                count("attendance_marked")
+                self.marked_until = time.monotonic() + 1.5
 
-                        best_match_index = np.argmin(face_distances)
+                print(f"[ATTENDANCE] {name} marked present")
+                # Queued; merged with other marks if students arrive together
+                announce_mark(name)
+
+        def update_frame(self):
+            if not self.is_running or not self.grabber:
+                return
 
-                        if matches[best_match_index]:
-                            sid = self.known_ids[best_match_index]
-                            name = self.known_names[best_match_index]
+            try:
+                _, frame = self.grabber.latest()
+                if frame is None:
+                    return
 
-                            if already_logged_today(sid, self.unit_id) or (sid, self.unit_id) in self.logged_students:
-                                continue
+                render_start = time.perf_counter()
+                small_frame = cv2.resize(frame, PROCESS_SIZE)
 
-                            # Draw rectangle and name on small frame
-                            top, right, bottom, left = face_location
-                            cv2.rectangle(small_frame, (left, top), (right, bottom), (0, 255, 0), 2)
-                            cv2.putText(small_frame, name, (left, top - 10),
-                                        cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+                # Draw the most recent recognition results on the live frame;
+                # boxes are mapped from camera resolution to the preview
+                sx = PROCESS_SIZE[0] / float(frame.shape[1])
+                sy = PROCESS_SIZE[1] / float(frame.shape[0])
+                if self.last_result is not None:
+                    for match, face_location in zip(self.last_result.matches, self.last_result.locations):
+                        if not match.accepted:
+                            continue
+                        top, right, bottom, left = scale_box(face_location, sx, sy)
+                        cv2.rectangle(small_frame, (left, top), (right, bottom), (0, 255, 0), 2)
+                        cv2.putText(small_frame, match.name, (left, top - 10),
+                                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
 
-                            # Save attendance
-                            log_attendance(sid, name)
-                            save_to_json_log(sid, name, self.unit_id)
-                            self.logged_students.add((sid, self.unit_id))
+                if time.monotonic() < self.marked_until:
+                    cv2.putText(small_frame, "✔ Attendance Marked", (50, 30),
+                                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 200, 0), 2)
 
-                            # Show confirmation
-                            cv2.putText(small_frame, "✔ Attendance Marked", (50, 30),
-                                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 200, 0), 2)
-                            print(f"[ATTENDANCE] {name} marked present")
-                            # Speak confirmation
-                            speak(f"Attendance marked for {name}")
+                if self.timings_check.isChecked():
+                    self.draw_timings(small_frame)
 
                 # Add instructions to display
                 cv2.putText(small_frame, "Press STOP to end", (10, small_frame.shape[0] - 10),
@@ -332,10 +272,54 @@ def _create_attendance_window_class():
                 qt_image = QImage(small_frame.data, w, h, bytes_per_line, QImage.Format_RGB888).rgbSwapped()
                 pixmap = QPixmap.fromImage(qt_image)
                 self.video_label.setPixmap(pixmap.scaledToWidth(self.video_label.width()))
+
+                self.scheduler.record("render", time.perf_counter() - render_start)
+                self.scheduler.frame_rendered()
+                interval = self.scheduler.display_interval_ms()
+                if interval != self.timer.interval():
+                    self.timer.setInterval(interval)
             except Exception as e:
                 print(f"[ERROR] Frame update failed: {e}")
                 self.stop_attendance()
 
+        def draw_timings(self, frame):
+            """Overlay display FPS and recent p50/p95 per pipeline stage"""
+            lines = [f"UI {self.scheduler.ui_fps.get():.0f} fps"]
+            for stage in ("read", "detect", "encode", "match", "render", "db_write", "json_write", "tts"):
+                summary = METRICS.histogram(stage)
+                if summary:
+                    lines.append(f"{stage} {summary['p50_ms']:.0f}/{summary['p95_ms']:.0f} ms")
+            for i, line in enumerate(lines):
+                y = 14 + i * 14
+                cv2.putText(frame, line, (PROCESS_SIZE[0] - 130, y), cv2.FONT_HERSHEY_SIMPLEX,
+                            0.4, (0, 0, 0), 3)
+                cv2.putText(frame, line, (PROCESS_SIZE[0] - 130, y), cv2.FONT_HERSHEY_SIMPLEX,
+                            0.4, (255, 255, 255), 1)
+
+        def shutdown_pipeline(self):
+            """Stop the worker and capture threads, then release the camera"""
+            if self.timer:
+                self.timer.stop()
+            if self.worker:
+                self.worker.stop()
+                print(f"[INFO] Recognition stats: {self.worker.stats()}")
+                self.worker = None
+            if self.pool:
+                self.pool.close()
+                self.pool = None
+            if self.grabber:
+                self.grabber.stop()
+                self.grabber = None
+            if self.dumper:
+                self.dumper.stop()
+                self.dumper = None
+            if self.voice_worker:
+                self.voice_worker.stop()
+                print(f"[INFO] Voice stats: {self.voice_worker.stats()}")
+                self.voice_worker = None
+            if self.video:
+                self.video.release()
+
         def start_voice_attendance(self):
             """Start voice-based attendance"""
             self.unit_id = self.unit_combo.currentData()
@@ -344,6 +328,8 @@ def _create_attendance_window_class():
                 return
             
             try:
+                self.attendance_index = AttendanceIndex.load()
+
                 # Disable unit selection and enable stop button
                 self.unit_combo.setEnabled(False)
                 self.stop_btn.setEnabled(True)
@@ -354,57 +340,68 @@ def _create_attendance_window_class():
                 print("[INFO] Voice attendance started.")
                 speak("Voice attendance started. Say your name or student ID when ready.")
                 
-                # Timer for voice input - use longer interval to avoid spamming
-                self.voice_timer = QTimer()
-                self.voice_timer.timeout.connect(self.process_voice_input)
-                self.voice_timer.start(3000)  # Check for voice input every 3 seconds
-                self.last_voice_check = datetime.now()
-                
+                # Utterances are looked up in this unit's roster index; the
+                # offline backend only decodes phrases from the same roster
+                self.roster_index = get_roster_index(self.unit_id)
+                self.vocabulary = RosterVocabulary(self.roster_index.roster())
+                backend = create_backend()
+                backend.set_vocabulary(self.vocabulary)
+                # The microphone stays open; utterances are segmented and
+                # recognised off the GUI thread and arrive through heard
+                self.voice_worker = VoiceAttendanceWorker(backend)
+                self.voice_worker.heard.connect(self.on_voice_text)
+                self.voice_worker.failed.connect(self.on_voice_failed)
+                self.voice_worker.start()
+
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Failed to start voice attendance: {e}")
                 print(f"[ERROR] Voice attendance failed: {e}")
                 self.is_running = False
 
-        def process_voice_input(self):
-            """Process voice input in background"""
+        def on_voice_failed(self, error):
+            QMessageBox.critical(self, "Microphone Error", f"Cannot listen for voice input: {error}")
+            self.stop_attendance()
+
+        def on_voice_text(self, text):
+            """Handle an utterance recognised by the voice worker"""
             if not self.is_running:
                 return
             
             try:
-                # Listen for voice
-                text = listen_for_voice()
-                
                 if text:
-                    # Search for student by name or ID
-                    conn = sqlite3.connect("database/students.db")
-                    cursor = conn.cursor()
-                    
-                    # Try to find student by name or ID
-                    cursor.execute(
-                        "SELECT student_id, name FROM students WHERE LOWER(name) LIKE ? OR student_id LIKE ?",
-                        (f"%{text}%", f"%{text}%")
-                    )
-                    result = cursor.fetchone()
-                    conn.close()
-                    
-                    if result:
-                        sid, name = result
+                    # Ranked fuzzy lookup over this unit's roster; picks up
+                    # enrolment changes made while the session is running
+                    if self.roster_index.refresh():
+                        # Let the offline backend decode the new roster too
+                        self.vocabulary = RosterVocabulary(self.roster_index.roster())
+                        self.voice_worker.set_vocabulary(self.vocabulary)
+                    candidates = self.roster_index.search(text)
+                    match = self.roster_index.best(text)
+
+                    if match is None and candidates and candidates[0].score >= MIN_SCORE:
+                        count("voice_ambiguous")
+                        names = " or ".join(c.name for c in candidates[:2])
+                        speak("Please say your full name or student ID.", PRIORITY_ALERT)
+                        self.video_label.setText(f"❓ Did you mean {names}?\n\nPlease say your full name or ID...")
+                    elif match:
+                        sid, name = match.student_id, match.name
                         
-                        if not (already_logged_today(sid, self.unit_id) or (sid, self.unit_id) in self.logged_students):
+                        if not self.attendance_index.is_marked(sid, self.unit_id):
                             # Mark attendance
-                            log_attendance(sid, name)
-                            save_to_json_log(sid, name, self.unit_id)
-                            self.logged_students.add((sid, self.unit_id))
+                            get_attendance_writer().submit(sid, name, self.unit_id)
+                            append_attendance(sid, name, self.unit_id)
+                            self.attendance_index.mark(sid, self.unit_id)
                             
                             # Visual feedback
                             self.video_label.setText(f"✅ Attendance marked for {name}\n\nSay next student name...")
-                            speak(f"Attendance marked for {name}")
+                            announce_mark(name)
                             print(f"[ATTENDANCE] {name} marked present via voice")
                         else:
                             speak(f"{name} already marked present")
                             self.video_label.setText(f"Already marked: {name}\n\nSay next student name...")
                     else:
-                        speak("Student not found. Please try again.")
+                        count("voice_not_found")
+                        speak("Student not found. Please try again.", PRIORITY_ALERT)
                         self.video_label.setText("❌ Student not found\n\nPlease say a valid student name...")
                         
             except Exception as e:
@@ -413,24 +410,24 @@ def _create_attendance_window_class():
         def stop_attendance(self):
 
             self.is_running = False
-            if self.timer:
-                self.timer.stop()
-            if hasattr(self, 'voice_timer'):
-                self.voice_timer.stop()
-            if self.video:
-                self.video.release()
+            self.shutdown_pipeline()
+            # Make sure every mark of this session is committed and on disk
+            writer = get_attendance_writer()
+            writer.flush(durable=True)
+            get_attendance_log().sync()
+            print(f"[INFO] Attendance writer stats: {writer.stats()}")
             print("[INFO] Attendance session ended.")
             self.unit_combo.setEnabled(True)
+            self.backend_combo.setEnabled(True)
             self.stop_btn.setEnabled(False)
             self.video_label.setText("Select a unit and click 'Start Attendance' to begin...")
-            self.logged_students = set()
+            self.attendance_index = None
 
         def closeEvent(self, event):
             self.is_running = False
-            if self.timer:
-                self.timer.stop()
-            if self.video and self.video.isOpened():
-                self.video.release()
+            self.shutdown_pipeline()
+            get_attendance_writer().flush(durable=True)
+            get_attendance_log().sync()
             event.accept()
 
     return AttendanceWindow
@@ -2,61 +2,24 @@
 
 import cv2
 import face_recognition
-import numpy as np
 import sounddevice as sd
 import scipy.io.wavfile as wav
 import os
 import tempfile
-import pyttsx3
-import json
-from datetime import datetime
-from face_engine.recognizer import match_voice, load_all_encodings
+from face_engine.recognizer import match_voice
+from face_engine.gallery import FaceGallery
+from face_engine.overlay import ConfirmationOverlay
+from face_engine.tracker import FaceTracker
 from database.student_db import log_attendance
-
-# Initialize text-to-speech engine
-
-
-def speak(text):
-    try:
-        engine = pyttsx3.init(driverName='sapi5')  # Windows voice API
-        engine.setProperty('rate', 160)
-        engine.say(text)
-        engine.runAndWait()
-    except Exception as e:
-        print("🔇 Voice error:", e)
-
-
-def already_logged_today(student_id):
-    today = datetime.now().strftime("%Y-%m-%d")
-    log_file = "attendance_logs.json"
-    if os.path.exists(log_file):
-        with open(log_file, "r") as f:
-            logs = json.load(f)
-            for log in logs:
-                if log["student_id"] == student_id and log["timestamp"].startswith(today):
-                    return True
-    return False
-
-
-def save_to_json_log(student_id, name):
-    log_file = "attendance_logs.json"
-    new_log = {
-        "student_id": student_id,
-        "name": name,
-        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    }
-    if os.path.exists(log_file):
-        with open(log_file, "r") as f:
-            logs = json.load(f)
-    else:
-        logs = []
-    logs.append(new_log)
-    with open(log_file, "w") as f:
-        json.dump(logs, f, indent=4)
+from database.attendance_index import AttendanceIndex
+from database.attendance_log import append_attendance
+from voice_engine.tts import speak, announce_mark, get_speech_service, PRIORITY_ALERT
 
 
 def capture_voice(temp_path, seconds=3):
-    speak("Face not recognized. Please speak your name.")
+    speak("Face not recognized. Please speak your name.", PRIORITY_ALERT)
+    # Let the prompt finish so the recording does not pick it up
+    get_speech_service().wait_idle()
     print("🎙️ Listening...")
     fs = 44100
     recording = sd.rec(int(seconds * fs), samplerate=fs, channels=1)
@@ -64,30 +27,32 @@ def capture_voice(temp_path, seconds=3):
     wav.write(temp_path, fs, recording)
 
 
-def mark_attendance(student_id, name, frame, show_pos=(50, 50)):
+def mark_attendance(student_id, name, overlay, track_id):
+    """Record a mark and queue its confirmation; returns immediately."""
     log_attendance(student_id, name)
-    save_to_json_log(student_id, name)
-    speak(f"{name}, attendance marked. Next student.")
-    cv2.putText(frame, f"{name}", show_pos, cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 200, 0), 2)
-    cv2.putText(frame, "✔ Attendance Marked", (show_pos[0], show_pos[1] + 30),
-                cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 200, 0), 2)
-    cv2.imshow("EduScan", frame)
-    cv2.waitKey(3000)
+    append_attendance(student_id, name)
+    announce_mark(name)
+    overlay.confirm(track_id, name)
 
 
 def start_attendance_camera():
-    known_ids, known_names, known_encodings = load_all_encodings()
+    gallery = FaceGallery.from_database(tolerance=0.5)
     video = cv2.VideoCapture(0)
 
     if not video.isOpened():
         print("❌ Could not open webcam.")
-        speak("Webcam error. Please check your camera.")
+        speak("Webcam error. Please check your camera.", PRIORITY_ALERT)
         return
 
     print("🎯 EduScan started. Press Q to quit.")
     speak("EduScan started. Please face the camera.")
 
-    logged_students = set()
+    attendance_index = AttendanceIndex.load()
+    tracker = FaceTracker()
+    overlay = ConfirmationOverlay()
+    # Tracks already told they are marked, or already asked for their voice
+    notified = set()
+    voice_tried = set()
 
     while True:
         ret, frame = video.read()
@@ -96,57 +61,62 @@ def start_attendance_camera():
 
         rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
         faces = face_recognition.face_locations(rgb)
-        encodings = face_recognition.face_encodings(rgb, faces)
+        tracks = tracker.update(faces)
 
-        recognized = False
+        pending = [track for track in tracks if tracker.needs_encoding(track)]
+        if pending:
+            encodings = face_recognition.face_encodings(rgb, [track.box for track in pending])
+            for track, match in zip(pending, gallery.match(encodings)):
+                tracker.set_match(track, match)
 
-        for face_encoding, face_loc in zip(encodings, faces):
-            matches = face_recognition.compare_faces(known_encodings, face_encoding, tolerance=0.5)
-            face_distances = face_recognition.face_distance(known_encodings, face_encoding)
+        recognized = False
 
-            if len(face_distances) == 0:
+        for track in tracks:
+            match = track.match
+            if not match.accepted:
                 continue
-
-            best_match_index = np.argmin(face_distances)
-
-            if matches[best_match_index]:
-                sid = known_ids[best_match_index]
-                name = known_names[best_match_index]
-
-                if already_logged_today(sid) or sid in logged_students:
+            recognized = True
+            sid = match.student_id
+            name = match.name
+
+            top, right, bottom, left = track.box
+            cv2.rectangle(frame, (left, top), (right, bottom), (0, 255, 0), 2)
+            cv2.putText(frame, f"{name}", (left, top - 10), cv2.FONT_HERSHEY_SIMPLEX,
+                        0.8, (0, 255, 0), 2)
+
+            if attendance_index.is_marked(sid):
+                if track.track_id not in notified:
+                    notified.add(track.track_id)
                     speak(f"{name}, your attendance is already marked.")
                     print(f"⚠️ {name} already marked.")
-                    recognized = True
-                    break
-
-                top, right, bottom, left = face_loc
-                cv2.rectangle(frame, (left, top), (right, bottom), (0, 255, 0), 2)
-                cv2.putText(frame, f"{name}", (left, top - 10), cv2.FONT_HERSHEY_SIMPLEX,
-                            0.8, (0, 255, 0), 2)
+                continue
 
-                mark_attendance(sid, name, frame)
-                logged_students.add(sid)
-                recognized = True
-                break
+            mark_attendance(sid, name, overlay, track.track_id)
+            attendance_index.mark(sid)
+            notified.add(track.track_id)
 
-        if not recognized and len(faces) > 0:
+        # Ask for a name once per unknown face rather than on every frame
+        unknown = [track for track in tracks if track.track_id not in voice_tried]
+        if not recognized and unknown:
+            track = unknown[0]
+            voice_tried.add(track.track_id)
             with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmpfile:
                 capture_voice(tmpfile.name)
                 sid, name = match_voice(tmpfile.name)
-                os.remove(tmpfile.name)
+            os.remove(tmpfile.name)
 
-                if sid and name:
-                    if already_logged_today(sid) or sid in logged_students:
-                        speak(f"{name}, your attendance is already marked.")
-                        print(f"⚠️ {name} already marked by voice.")
-                        continue
-
-                    mark_attendance(sid, name, frame)
-                    logged_students.add(sid)
+            if sid and name:
+                if attendance_index.is_marked(sid):
+                    speak(f"{name}, your attendance is already marked.")
+                    print(f"⚠️ {name} already marked by voice.")
                 else:
-                    speak("Voice not recognized. Try again.")
-                    print("❌ Voice match failed.")
+                    mark_attendance(sid, name, overlay, track.track_id)
+                    attendance_index.mark(sid)
+            else:
+                speak("Voice not recognized. Try again.", PRIORITY_ALERT)
+                print("❌ Voice match failed.")
 
+        overlay.draw(frame, tracks)
         cv2.imshow("EduScan", frame)
 
         if cv2.waitKey(1) & 0xFF == ord("q"):
@@ -0,0 +1,223 @@
+"""Headless bulk enrolment from a roster CSV and a folder of ID photos.
+
+    python run_encode.py enroll roster.csv --photos students/intake --unit 3
+
+The roster needs student_id and name columns; an optional photo column
+names the image (relative to --photos), otherwise <student_id>.jpg is
+used. Photos are decoded, detected and encoded in a process pool while the
+roster is still being read, and students are written in batched
+transactions. Rows that cannot be enrolled go to a rejection report CSV.
+"enroll" may be left out: `python run_encode.py roster.csv` still works.
+
+    python run_encode.py sync
+
+re-encodes only the photos under students/ that changed since the last
+run, writes their encodings to the database and deletes students whose
+photos are all gone.
+"""
+import argparse
+import csv
+import hashlib
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import cv2
+import face_recognition
+import numpy as np
+
+from database.connection import get_connection
+from database.student_db import ensure_schema, save_students_batch, student_key
+
+# ID photos are often straight off a scanner; dlib does not need more
+MAX_SIDE = 1280
+BATCH_SIZE = 200
+# Tasks in flight per worker; bounds memory no matter how large the roster
+QUEUE_DEPTH = 4
+REPORT_FIELDS = ["student_id", "name", "photo", "reason"]
+
+
+def _encode_photo(path):
+    """Worker: (status, encoding bytes or None, sha1 of the file)."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return "missing_photo", None, None
+    digest = hashlib.sha1(data).hexdigest()
+
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    del data
+    if image is None:
+        return "unreadable_photo", None, digest
+    scale = MAX_SIDE / max(image.shape[:2])
+    if scale < 1:
+        image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+    locations = face_recognition.face_locations(rgb)
+    if not locations:
+        return "no_face", None, digest
+    if len(locations) > 1:
+        return "multiple_faces", None, digest
+    encodings = face_recognition.face_encodings(rgb, locations)
+    if not encodings:
+        return "no_face", None, digest
+    return "ok", np.asarray(encodings[0], dtype=np.float32).tobytes(), digest
+
+
+def read_roster(path, photos_dir):
+    """Yield (student_id, name, photo path) rows without loading the file."""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for row in csv.DictReader(f):
+            row = {k.strip().lower(): (v or "").strip() for k, v in row.items() if k}
+            student_id = row.get("student_id", "")
+            photo = row.get("photo") or f"{student_id}.jpg"
+            yield student_id, row.get("name", ""), os.path.join(photos_dir, photo)
+
+
+class Progress:
+    def __init__(self, total=None):
+        self.total = total
+        self.done = 0
+        self.start = time.monotonic()
+        self._last = 0.0
+
+    def step(self):
+        self.done += 1
+        if time.monotonic() - self._last >= 0.5:
+            self.show()
+
+    def show(self):
+        now = self._last = time.monotonic()
+        elapsed = now - self.start
+        rate = self.done / elapsed if elapsed else 0.0
+        if self.total:
+            eta = (self.total - self.done) / rate if rate else 0.0
+            line = f"{self.done}/{self.total} ({rate:.1f}/s, ETA {eta:.0f}s)"
+        else:
+            line = f"{self.done} ({rate:.1f}/s)"
+        print(f"\r[INFO] Encoded {line}   ", end="", file=sys.stderr, flush=True)
+
+
+def _count_rows(path):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        return max(0, sum(1 for _ in csv.reader(f)) - 1)
+
+
+def enroll(roster, photos_dir, unit_id=None, workers=None, batch_size=BATCH_SIZE,
+           report_path="enrollment_rejections.csv"):
+    ensure_schema()
+    existing = {student_key(row[0]) for row in get_connection().execute("SELECT student_id FROM students")}
+    seen_ids = set()
+    seen_photos = {}
+    batch = []
+    enrolled = 0
+    rejected = 0
+
+    workers = workers or max(1, (os.cpu_count() or 2) - 1)
+    progress = Progress(_count_rows(roster))
+
+    with open(report_path, "w", newline="", encoding="utf-8") as report_file:
+        report = csv.DictWriter(report_file, fieldnames=REPORT_FIELDS)
+        report.writeheader()
+
+        def reject(student_id, name, photo, reason):
+            nonlocal rejected
+            rejected += 1
+            report.writerow({"student_id": student_id, "name": name, "photo": photo, "reason": reason})
+
+        def flush():
+            nonlocal enrolled
+            if batch:
+                enrolled += save_students_batch(batch, unit_id=unit_id)
+                batch.clear()
+
+        def collect(future, row):
+            student_id, name, photo = row
+            status, encoding, digest = future.result()
+            progress.step()
+            if status != "ok":
+                reject(student_id, name, photo, status)
+                return
+            if digest in seen_photos:
+                reject(student_id, name, photo, f"duplicate_photo:{seen_photos[digest]}")
+                return
+            seen_photos[digest] = student_id
+            batch.append((student_id, name, np.frombuffer(encoding, dtype=np.float32), None))
+            if len(batch) >= batch_size:
+                flush()
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = {}
+            for student_id, name, photo in read_roster(roster, photos_dir):
+                if not student_id or not name:
+                    progress.step()
+                    reject(student_id, name, photo, "missing_id_or_name")
+                    continue
+                if student_key(student_id) in seen_ids:
+                    progress.step()
+                    reject(student_id, name, photo, "duplicate_id")
+                    continue
+                seen_ids.add(student_key(student_id))
+                if student_key(student_id) in existing:
+                    progress.step()
+                    reject(student_id, name, photo, "already_enrolled")
+                    continue
+
+                pending[pool.submit(_encode_photo, photo)] = (student_id, name, photo)
+                if len(pending) >= workers * QUEUE_DEPTH:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        collect(future, pending.pop(future))
+
+            for future in list(pending):
+                collect(future, pending.pop(future))
+        flush()
+
+    progress.show()
+    elapsed = time.monotonic() - progress.start
+    print(file=sys.stderr)
+    print(f"[INFO] Enrolled {enrolled} students, rejected {rejected} in {elapsed:.1f}s.")
+    if rejected:
+        print(f"[INFO] Rejection report: {report_path}")
+    return enrolled, rejected
+
+
+def sync():
+    # Imported here: the recognizer loads the optional voice encoder
+    from face_engine.recognizer import encode_faces
+    return encode_faces(sync_db=True)
+
+
+COMMANDS = ("enroll", "sync")
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if argv and argv[0] not in COMMANDS and argv[0] not in ("-h", "--help"):
+        argv.insert(0, "enroll")
+
+    parser = argparse.ArgumentParser(description="Enrol students and keep their face encodings current.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    enroll_parser = commands.add_parser("enroll", help="bulk-enrol students from a roster CSV and ID photos")
+    enroll_parser.add_argument("roster", help="CSV with student_id, name and optional photo columns")
+    enroll_parser.add_argument("--photos", default="students", help="folder the photo paths are relative to")
+    enroll_parser.add_argument("--unit", type=int, default=None, help="also assign every student to this unit id")
+    enroll_parser.add_argument("--workers", type=int, default=None)
+    enroll_parser.add_argument("--batch", type=int, default=BATCH_SIZE, help="students per transaction")
+    enroll_parser.add_argument("--report", default="enrollment_rejections.csv")
+    commands.add_parser("sync", help="re-encode changed photos under students/ into the database")
+    args = parser.parse_args(argv)
+
+    if args.command == "sync":
+        sync()
+    else:
+        enroll(args.roster, args.photos, args.unit, args.workers, args.batch, args.report)
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    main()
@@ -1,48 +1,15 @@
 import cv2
 import face_recognition
-import numpy as np
-import os
-import json
-from datetime import datetime
-from face_engine.recognizer import load_all_encodings
+from face_engine.gallery import FaceGallery
+from face_engine.overlay import ConfirmationOverlay
+from face_engine.tracker import FaceTracker
 from database.student_db import log_attendance
-import pyttsx3
-
-def speak(text):
-    engine = pyttsx3.init()
-    engine.setProperty('rate', 160)
-    engine.say(text)
-    engine.runAndWait()
-
-def already_logged_today(student_id):
-    today = datetime.now().strftime("%Y-%m-%d")
-    log_file = "attendance_logs.json"
-    if os.path.exists(log_file):
-        with open(log_file, "r") as f:
-            logs = json.load(f)
-            for log in logs:
-                if log["student_id"] == student_id and log["timestamp"].startswith(today):
-                    return True
-    return False
-
-def save_to_json_log(student_id, name):
-    log_file = "attendance_logs.json"
-    new_log = {
-        "student_id": student_id,
-        "name": name,
-        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    }
-    if os.path.exists(log_file):
-        with open(log_file, "r") as f:
-            logs = json.load(f)
-    else:
-        logs = []
-    logs.append(new_log)
-    with open(log_file, "w") as f:
-        json.dump(logs, f, indent=4)
+from database.attendance_index import AttendanceIndex
+from database.attendance_log import append_attendance
+from voice_engine.tts import announce_mark
 
 def start_attendance():
-    known_ids, known_names, known_encodings = load_all_encodings()
+    gallery = FaceGallery.from_database(tolerance=0.5)
     video = cv2.VideoCapture(0)
 
     if not video.isOpened():
@@ -51,7 +18,12 @@ def start_attendance():
 
     print("✅ EduScan Started. Face recognition in progress...")
 
-    logged_students = set()
+    attendance_index = AttendanceIndex.load()
+
+    # Faces keep a track ID across frames, so a face is only encoded until
+    # it is identified and its confirmation can follow it on screen
+    tracker = FaceTracker()
+    overlay = ConfirmationOverlay()
 
     while True:
         ret, frame = video.read()
@@ -60,46 +32,41 @@ def start_attendance():
 
         rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
         face_locations = face_recognition.face_locations(rgb_frame)
-        face_encodings = face_recognition.face_encodings(rgb_frame, face_locations)
+        tracks = tracker.update(face_locations)
 
-        for face_encoding, face_location in zip(face_encodings, face_locations):
-            matches = face_recognition.compare_faces(known_encodings, face_encoding, tolerance=0.5)
-            face_distances = face_recognition.face_distance(known_encodings, face_encoding)
+        pending = [track for track in tracks if tracker.needs_encoding(track)]
+        if pending:
+            face_encodings = face_recognition.face_encodings(rgb_frame, [track.box for track in pending])
+            for track, match in zip(pending, gallery.match(face_encodings)):
+                tracker.set_match(track, match)
 
-            if len(face_distances) == 0:
+        for track in tracks:
+            match = track.match
+            if not match.accepted:
                 continue
+            sid = match.student_id
+            name = match.name
 
-            best_match_index = np.argmin(face_distances)
-
-            if matches[best_match_index]:
-                sid = known_ids[best_match_index]
-                name = known_names[best_match_index]
-
-                # Skip if already logged
-                if already_logged_today(sid) or sid in logged_students:
-                    continue
+            top, right, bottom, left = track.box
+            cv2.rectangle(frame, (left, top), (right, bottom), (0, 255, 0), 2)
+            cv2.putText(frame, name, (left, top - 10),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
 
-                # Draw rectangle
-                top, right, bottom, left = face_location
-                cv2.rectangle(frame, (left, top), (right, bottom), (0, 255, 0), 2)
-                cv2.putText(frame, name, (left, top - 10),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
-
-                # ✅ Save Attendance
-                log_attendance(sid, name)
-                save_to_json_log(sid, name)
-                logged_students.add(sid)
+            # Skip if already logged
+            if attendance_index.is_marked(sid):
+                continue
 
-                # ✅ Show success + announce
-                cv2.putText(frame, "✔ Attendance Marked – Next Student", (100, 50),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 200, 0), 3)
-                speak(f"{name}, attendance marked. Next student.")
+            # ✅ Save Attendance
+            log_attendance(sid, name)
+            append_attendance(sid, name)
+            attendance_index.mark(sid)
 
-                # Show confirmation for 2.5 seconds
-                cv2.imshow("EduScan Attendance", frame)
-                cv2.waitKey(2500)
-                break  # Move to next frame
+            # ✅ Announce; the confirmation stays on this face for a few
+            # seconds while the next students are recognised
+            announce_mark(name)
+            overlay.confirm(track.track_id, name)
 
+        overlay.draw(frame, tracks)
         cv2.imshow("EduScan Attendance", frame)
 
         if cv2.waitKey(1) & 0xFF == ord("q"):
@@ -0,0 +1,314 @@
+"""In-memory fuzzy index of a unit's roster for spoken name/ID lookup.
+
+Every student is indexed by their normalised name tokens, two phonetic
+keys per token (Soundex and a small Metaphone-style skeleton) and the
+character trigrams of each token and of their ID. A lookup gathers
+candidates from the inverted indexes and scores only those, so its cost
+depends on how many students share sounds with the query rather than on
+the size of the roster.
+
+Scores are in 0..1. An exact token beats a prefix, so "shad" ranks a
+student called Shad above Shadrack and "shadrack" does the opposite.
+best() only answers when the winner is both good enough and clearly ahead
+of the runner-up.
+"""
+import re
+import threading
+import unicodedata
+from collections import defaultdict, namedtuple
+from database.student_db import gallery_version, load_roster, roster_version
+
+DIGIT_WORDS = {"zero": "0", "oh": "0", "one": "1", "two": "2", "three": "3", "four": "4",
+               "five": "5", "six": "6", "seven": "7", "eight": "8", "nine": "9"}
+# Unit rosters with nobody assigned fall back to every student, as the
+# face gallery does
+FALLBACK_TO_ALL_STUDENTS = True
+
+MIN_SCORE = 0.6
+MIN_MARGIN = 0.1
+PREFIX_WEIGHT = 0.9
+SOUNDEX_SCORE = 0.7
+METAPHONE_SCORE = 0.8
+# Fewest digits that may identify a student by part of their ID
+ID_MIN_DIGITS = 4
+
+Candidate = namedtuple("Candidate", ["student_id", "name", "score", "confidence"])
+
+
+def normalize(text):
+    """Lowercase ASCII words; accents are folded ("Zoë" -> "zoe")."""
+    text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode("ascii")
+    return re.findall(r"[a-z]+|\d+", text.lower())
+
+
+def query_parts(text):
+    """Split an utterance into name tokens and the digits it contains.
+
+    Spoken digits ("two five eight six") count as digits.
+    """
+    tokens = []
+    digits = []
+    for token in normalize(text):
+        if token.isdigit():
+            digits.append(token)
+        elif token in DIGIT_WORDS:
+            digits.append(DIGIT_WORDS[token])
+        else:
+            tokens.append(token)
+    return tokens, "".join(digits)
+
+
+_SOUNDEX_CODES = {c: str(d) for d, letters in enumerate(
+    ["aeiouyhw", "bfpv", "cgjkqsxz", "dt", "l", "mn", "r"]) for c in letters}
+
+
+def soundex(token):
+    codes = _SOUNDEX_CODES
+    if not token:
+        return ""
+    key = token[0].upper()
+    last = codes.get(token[0], "")
+    for c in token[1:]:
+        code = codes.get(c, "")
+        if code and code != "0" and code != last:
+            key += code
+        if c not in "hw":
+            last = code
+    return (key + "000")[:4]
+
+
+_METAPHONE_RULES = [
+    ("ph", "f"), ("ck", "k"), ("sch", "sk"), ("sh", "x"), ("ch", "x"), ("th", "0"),
+    ("gh", "g"), ("kn", "n"), ("wr", "r"), ("q", "k"), ("x", "ks"), ("z", "s"),
+    ("v", "f"), ("c", "k"), ("d", "t"), ("b", "p"), ("g", "k"),
+]
+
+
+def metaphone(token):
+    """A consonant skeleton in the spirit of Metaphone.
+
+    Close enough to merge the spellings a recognizer produces for one name
+    ("mohamed", "muhammad"), not a full implementation.
+    """
+    if not token:
+        return ""
+    key = token
+    for src, dst in _METAPHONE_RULES:
+        key = key.replace(src, dst)
+    first, rest = key[0], re.sub(r"[aeiouyhw]", "", key[1:])
+    key = first + rest
+    return re.sub(r"(.)\1+", r"\1", key)
+
+
+def trigrams(token):
+    padded = f"${token}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _dice(a, b):
+    if not a or not b:
+        return 0.0
+    return 2.0 * len(a & b) / (len(a) + len(b))
+
+
+class _Entry:
+    __slots__ = ("student_id", "name", "tokens", "grams", "soundex", "metaphone", "digits", "keys")
+
+    def __init__(self, student_id, name):
+        self.student_id = student_id
+        self.name = name
+        self.tokens = [t for t in normalize(name) if not t.isdigit()]
+        self.grams = [trigrams(t) for t in self.tokens]
+        self.soundex = [soundex(t) for t in self.tokens]
+        self.metaphone = [metaphone(t) for t in self.tokens]
+        self.digits = "".join(re.findall(r"\d", student_id or ""))
+        # Every key under which this entry is posted, for removal
+        self.keys = set()
+
+
+class RosterIndex:
+    """Fuzzy name/ID lookup over one unit's students."""
+
+    def __init__(self, roster=(), unit_id=None):
+        self.unit_id = unit_id
+        self._entries = {}
+        self._postings = defaultdict(set)
+        self._lock = threading.Lock()
+        self._version = None
+        for student_id, name in roster:
+            self.add(student_id, name)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, student_id):
+        return student_id in self._entries
+
+    def roster(self):
+        """(student_id, name) of every indexed student."""
+        with self._lock:
+            return [(e.student_id, e.name) for e in self._entries.values()]
+
+    def add(self, student_id, name):
+        """Index a student, replacing any previous entry for the same ID."""
+        with self._lock:
+            self._remove(student_id)
+            entry = _Entry(student_id, name)
+            for i, token in enumerate(entry.tokens):
+                entry.keys.add(("t", token))
+                entry.keys.add(("s", entry.soundex[i]))
+                entry.keys.add(("m", entry.metaphone[i]))
+                entry.keys.update(("g", gram) for gram in entry.grams[i])
+            if entry.digits:
+                entry.keys.add(("d", entry.digits[-ID_MIN_DIGITS:]))
+                entry.keys.update(("g", gram) for gram in trigrams(entry.digits))
+            for key in entry.keys:
+                self._postings[key].add(student_id)
+            self._entries[student_id] = entry
+
+    def remove(self, student_id):
+        with self._lock:
+            self._remove(student_id)
+
+    def _remove(self, student_id):
+        entry = self._entries.pop(student_id, None)
+        if entry is None:
+            return
+        for key in entry.keys:
+            ids = self._postings.get(key)
+            if ids is not None:
+                ids.discard(student_id)
+                if not ids:
+                    del self._postings[key]
+
+    def _candidates(self, tokens, digits):
+        keys = []
+        for token in tokens:
+            keys.append(("t", token))
+            keys.append(("s", soundex(token)))
+            keys.append(("m", metaphone(token)))
+            keys.extend(("g", gram) for gram in trigrams(token))
+        if digits:
+            keys.append(("d", digits[-ID_MIN_DIGITS:]))
+            keys.extend(("g", gram) for gram in trigrams(digits))
+        found = set()
+        for key in keys:
+            found |= self._postings.get(key, set())
+        return found
+
+    @staticmethod
+    def _token_score(token, entry):
+        best = 0.0
+        q_grams = trigrams(token)
+        q_soundex = soundex(token)
+        q_metaphone = metaphone(token)
+        for i, name_token in enumerate(entry.tokens):
+            if token == name_token:
+                return 1.0
+            score = _dice(q_grams, entry.grams[i])
+            if name_token.startswith(token) or token.startswith(name_token):
+                shorter, longer = sorted((len(token), len(name_token)))
+                score = max(score, PREFIX_WEIGHT * shorter / longer)
+            if q_metaphone == entry.metaphone[i]:
+                score = max(score, METAPHONE_SCORE)
+            elif q_soundex == entry.soundex[i]:
+                score = max(score, SOUNDEX_SCORE)
+            best = max(best, score)
+        return best
+
+    @staticmethod
+    def _id_score(digits, entry):
+        if not entry.digits:
+            return 0.0
+        if digits == entry.digits:
+            return 1.0
+        if len(digits) >= ID_MIN_DIGITS:
+            if entry.digits.endswith(digits):
+                return 0.9
+            if digits in entry.digits:
+                return 0.85
+        return 0.8 * _dice(trigrams(digits), trigrams(entry.digits))
+
+    def _score(self, tokens, digits, entry):
+        scores = []
+        if tokens:
+            token_scores = [self._token_score(t, entry) for t in tokens]
+            name_score = sum(token_scores) / len(token_scores)
+            # Saying more of the name (first and last) should win over a
+            # single token that happens to match a longer name
+            matched = sum(1 for s in token_scores if s >= MIN_SCORE)
+            coverage = min(1.0, matched / float(len(entry.tokens) or 1))
+            scores.append(name_score * (0.85 + 0.15 * coverage))
+        if digits:
+            scores.append(self._id_score(digits, entry))
+        return max(scores) if scores else 0.0
+
+    def search(self, text, limit=3):
+        """Top candidates for an utterance, best first."""
+        tokens, digits = query_parts(text)
+        if not tokens and not digits:
+            return []
+        with self._lock:
+            scored = []
+            for student_id in self._candidates(tokens, digits):
+                entry = self._entries[student_id]
+                scored.append((self._score(tokens, digits, entry), entry))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        scored = scored[:max(limit, 2)]
+
+        results = []
+        for rank, (score, entry) in enumerate(scored[:limit]):
+            # Confidence is the score discounted by how close the next best is
+            others = [s for i, (s, _) in enumerate(scored) if i != rank]
+            runner_up = max(others) if others else 0.0
+            confidence = score * min(1.0, max(0.0, score - runner_up) / MIN_MARGIN) if score else 0.0
+            results.append(Candidate(entry.student_id, entry.name, round(score, 3), round(confidence, 3)))
+        return results
+
+    def best(self, text, min_score=MIN_SCORE, min_margin=MIN_MARGIN):
+        """The single student meant by text, or None if unsure or ambiguous."""
+        candidates = self.search(text, limit=2)
+        if not candidates or candidates[0].score < min_score:
+            return None
+        if len(candidates) > 1 and candidates[0].score - candidates[1].score < min_margin:
+            return None
+        return candidates[0]
+
+    def sync(self, roster):
+        """Apply the difference between the index and a fresh roster."""
+        roster = dict(roster)
+        for student_id in [sid for sid in self._entries if sid not in roster]:
+            self.remove(student_id)
+        changed = 0
+        for student_id, name in roster.items():
+            entry = self._entries.get(student_id)
+            if entry is None or entry.name != name:
+                self.add(student_id, name)
+                changed += 1
+        return changed
+
+    def refresh(self, fallback=FALLBACK_TO_ALL_STUDENTS):
+        """Re-read the roster only if students or unit assignments changed."""
+        version = (gallery_version(), roster_version())
+        if version == self._version:
+            return False
+        roster = load_roster(self.unit_id)
+        if not roster and fallback and self.unit_id is not None:
+            roster = load_roster()
+        self.sync(roster)
+        self._version = version
+        return True
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_roster_index(unit_id):
+    """Shared, up-to-date index for a unit (None for every student)."""
+    with _indexes_lock:
+        index = _indexes.get(unit_id)
+        if index is None:
+            index = _indexes[unit_id] = RosterIndex(unit_id=unit_id)
+    index.refresh()
+    return index
@@ -0,0 +1,265 @@
+"""Pluggable speech-to-text backends for voice attendance.
+
+Every backend takes one utterance of 16-bit mono PCM and returns the text
+it heard, or None:
+
+* "google": Google's free web recognizer through speech_recognition.
+  Needs internet and a round-trip per utterance.
+* "vosk": offline Kaldi decoding with the optional vosk package. Decoding
+  is restricted to a grammar made from the session roster (student names
+  and spoken IDs), so the output is always one of those phrases. Download
+  a small English model into VOSK_MODEL_DIR to enable it.
+
+"auto" uses vosk when the package and a model are present, and Google
+otherwise.
+
+Recorded utterances can be checked without a microphone:
+
+    python -m voice_engine.speech_backends clip.wav --unit 3 --backend vosk
+
+With --expect the command exits non-zero unless every file transcribes to
+that text ("" for nothing heard). voice_engine/fixtures/silence.wav is a
+stereo 44.1 kHz clip with no speech, so it also runs the WAV downmix and
+resampling path:
+
+    python -m voice_engine.speech_backends voice_engine/fixtures/silence.wav --backend vosk --expect ""
+"""
+import json
+import os
+import re
+import sys
+import threading
+import wave
+import numpy as np
+
+try:
+    import vosk
+except ImportError:
+    vosk = None
+
+SPEECH_BACKEND = "auto"
+VOSK_MODEL_DIR = "voice_engine/models/vosk"
+SAMPLE_RATE = 16000
+# Mean word confidence below which a grammar match is treated as noise
+MIN_CONFIDENCE = 0.6
+# Seconds a Google request may take; bounds how long stopping a session waits
+GOOGLE_TIMEOUT = 10
+
+# Loaded models by directory; loading takes seconds, so sessions share one
+_models = {}
+_models_lock = threading.Lock()
+
+DIGIT_WORDS = ["zero", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine"]
+
+
+def _words(text):
+    return re.findall(r"[a-z]+", text.lower())
+
+
+def spoken_id(student_id):
+    """How an ID such as INTE/MG/2586/09/22 is read out, letter by letter
+    and digit by digit: "i n t e m g two five eight six zero nine two two"."""
+    words = []
+    for part in re.findall(r"[A-Za-z]+|\d", student_id):
+        if part.isdigit():
+            words.append(DIGIT_WORDS[int(part)])
+        else:
+            words.extend(part.lower())
+    return " ".join(words)
+
+
+class RosterVocabulary:
+    """The phrases a session can expect, mapped back to students.
+
+    Each student contributes their full name, each part of their name and
+    their spoken ID (with and without the letter prefix).
+    """
+
+    def __init__(self, roster):
+        self.students = {sid: name for sid, name in roster}
+        self._phrases = {}
+        for sid, name in roster:
+            name_words = _words(name or "")
+            phrases = {" ".join(name_words)} | set(name_words)
+            spoken = spoken_id(sid)
+            phrases.add(spoken)
+            phrases.add(" ".join(w for w in spoken.split() if w in DIGIT_WORDS))
+            for phrase in phrases:
+                if phrase:
+                    self._phrases.setdefault(phrase, set()).add(sid)
+
+    def phrases(self):
+        return sorted(self._phrases)
+
+    def resolve(self, text):
+        """(student_id, name) for a phrase that names exactly one student."""
+        sids = self._phrases.get(" ".join(_words(text or "")))
+        if not sids or len(sids) != 1:
+            return None
+        sid = next(iter(sids))
+        return sid, self.students[sid]
+
+    def __len__(self):
+        return len(self.students)
+
+
+class SpeechBackend:
+    name = None
+    # True when transcribe() never needs the network
+    offline = False
+
+    def set_vocabulary(self, vocabulary):
+        """Restrict recognition to a roster; backends may ignore it."""
+        self.vocabulary = vocabulary
+
+    def load(self):
+        """Do slow start-up work; called on the thread that transcribes."""
+
+    def transcribe(self, pcm, sample_rate=SAMPLE_RATE):
+        raise NotImplementedError
+
+
+class GoogleBackend(SpeechBackend):
+    name = "google"
+
+    def __init__(self, timeout=GOOGLE_TIMEOUT):
+        self.timeout = timeout
+
+    def transcribe(self, pcm, sample_rate=SAMPLE_RATE):
+        import speech_recognition as sr
+        audio = sr.AudioData(pcm, sample_rate, 2)
+        recognizer = sr.Recognizer()
+        recognizer.operation_timeout = self.timeout
+        try:
+            return recognizer.recognize_google(audio)
+        except sr.UnknownValueError:
+            return None
+        except sr.RequestError as e:
+            print(f"[ERROR] Internet/API error: {e}")
+            return None
+
+
+class VoskBackend(SpeechBackend):
+    """Grammar-constrained offline decoding over the roster phrases."""
+
+    name = "vosk"
+    offline = True
+
+    def __init__(self, model_dir=VOSK_MODEL_DIR, min_confidence=MIN_CONFIDENCE):
+        if vosk is None:
+            raise RuntimeError("the vosk package is not installed")
+        if not os.path.isdir(model_dir):
+            raise RuntimeError(f"no vosk model in {model_dir}")
+        vosk.SetLogLevel(-1)
+        self.model_dir = model_dir
+        # Loaded on first use, on the thread that transcribes, so creating
+        # a backend never stalls the GUI
+        self.model = None
+        self.min_confidence = min_confidence
+        self.vocabulary = None
+        self._grammar = None
+        self._recognizers = {}
+
+    def set_vocabulary(self, vocabulary):
+        self.vocabulary = vocabulary
+        # "[unk]" absorbs speech that is not on the roster
+        self._grammar = json.dumps(vocabulary.phrases() + ["[unk]"]) if vocabulary else None
+        self._recognizers = {}
+
+    def load(self):
+        if self.model is None:
+            with _models_lock:
+                if self.model_dir not in _models:
+                    _models[self.model_dir] = vosk.Model(self.model_dir)
+                self.model = _models[self.model_dir]
+
+    def _recognizer(self, sample_rate):
+        recognizer = self._recognizers.get(sample_rate)
+        if recognizer is None:
+            self.load()
+            if self._grammar:
+                recognizer = vosk.KaldiRecognizer(self.model, sample_rate, self._grammar)
+            else:
+                recognizer = vosk.KaldiRecognizer(self.model, sample_rate)
+            recognizer.SetWords(True)
+            self._recognizers[sample_rate] = recognizer
+        return recognizer
+
+    def transcribe(self, pcm, sample_rate=SAMPLE_RATE):
+        recognizer = self._recognizer(sample_rate)
+        recognizer.AcceptWaveform(pcm)
+        # FinalResult also resets the recognizer for the next utterance
+        result = json.loads(recognizer.FinalResult())
+        words = [w for w in result.get("result", []) if w.get("word") != "[unk]"]
+        if not words:
+            return None
+        confidence = sum(w.get("conf", 0.0) for w in words) / len(words)
+        if confidence < self.min_confidence:
+            return None
+        return " ".join(w["word"] for w in words)
+
+
+BACKENDS = {"google": GoogleBackend, "vosk": VoskBackend}
+
+
+def create_backend(name=SPEECH_BACKEND):
+    if name != "auto":
+        return BACKENDS[name]()
+    try:
+        return VoskBackend()
+    except RuntimeError as e:
+        print(f"[INFO] Offline speech unavailable ({e}); using Google recognition.")
+        return GoogleBackend()
+
+
+def read_wav(path, sample_rate=SAMPLE_RATE):
+    """16-bit PCM from a WAV file, as mono at sample_rate."""
+    with wave.open(path, "rb") as f:
+        if f.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16-bit WAV files are supported")
+        channels = f.getnchannels()
+        rate = f.getframerate()
+        samples = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+    if channels > 1:
+        samples = samples.reshape(-1, channels)[:, 0]
+    if rate != sample_rate and len(samples):
+        positions = np.arange(0, len(samples), rate / float(sample_rate))
+        samples = np.interp(positions, np.arange(len(samples)), samples).astype(np.int16)
+    return samples.tobytes()
+
+
+def transcribe_wav(backend, path):
+    return backend.transcribe(read_wav(path), SAMPLE_RATE)
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Transcribe WAV files with a voice attendance backend.")
+    parser.add_argument("wavs", nargs="+")
+    parser.add_argument("--backend", default=SPEECH_BACKEND, choices=["auto"] + sorted(BACKENDS))
+    parser.add_argument("--unit", type=int, default=None, help="restrict to this unit's roster")
+    parser.add_argument("--expect", default=None, help='text every file must produce ("" for none)')
+    args = parser.parse_args(argv)
+
+    from database.student_db import load_roster
+    vocabulary = RosterVocabulary(load_roster(args.unit))
+    backend = create_backend(args.backend)
+    backend.set_vocabulary(vocabulary)
+
+    import time
+    failures = 0
+    for path in args.wavs:
+        start = time.perf_counter()
+        text = transcribe_wav(backend, path)
+        elapsed = (time.perf_counter() - start) * 1000
+        student = vocabulary.resolve(text) if text else None
+        print(json.dumps({"wav": path, "backend": backend.name, "text": text,
+                          "student": student, "ms": round(elapsed, 1)}))
+        if args.expect is not None and " ".join(_words(text or "")) != " ".join(_words(args.expect)):
+            print(f"[ERROR] {path}: expected {args.expect!r}, got {text!r}", file=sys.stderr)
+            failures += 1
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,215 @@
+"""One long-lived text-to-speech worker for the whole process.
+
+The pyttsx3 engine is created once, on the worker thread that uses it
+(SAPI5 is bound to the thread that initialised it). Callers only put an
+utterance on a small priority queue and return immediately, so the
+camera and recognition loops never wait for speech.
+
+When announcements back up, attendance confirmations waiting in the
+queue are merged into one ("3 students marked") and utterances older than
+their max_age are dropped instead of being read out late.
+"""
+import atexit
+import heapq
+import itertools
+import sys
+import threading
+import time
+from collections import namedtuple
+from metrics import timer, count
+
+try:
+    import pyttsx3
+except ImportError:
+    # Announcements are optional; attendance works silently without them
+    pyttsx3 = None
+
+# Lower numbers are spoken first
+PRIORITY_ALERT = 0
+PRIORITY_STATUS = 1
+PRIORITY_MARK = 2
+
+MAX_QUEUE = 16
+# Seconds an utterance may wait before it is no longer worth saying
+MAX_AGE = {PRIORITY_ALERT: 10.0, PRIORITY_STATUS: 6.0, PRIORITY_MARK: 4.0}
+RATE = 155
+VOLUME = 0.9
+DRIVER = "sapi5" if sys.platform == "win32" else None
+
+Utterance = namedtuple("Utterance", ["text", "priority", "kind", "created", "max_age"])
+
+
+class SpeechService(threading.Thread):
+    """Background speaker fed by a bounded priority queue."""
+
+    def __init__(self, max_queue=MAX_QUEUE, rate=RATE, volume=VOLUME, driver=DRIVER):
+        super().__init__(daemon=True, name="SpeechService")
+        self.max_queue = max_queue
+        self.rate = rate
+        self.volume = volume
+        self.driver = driver
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._speaking = False
+        self.spoken = 0
+        self.dropped = 0
+        self.coalesced = 0
+
+    def say(self, text, priority=PRIORITY_STATUS, kind=None, max_age=None):
+        """Queue text to be spoken; never blocks.
+
+        Utterances with kind="mark" may be merged with other waiting marks.
+        """
+        if max_age is None:
+            max_age = MAX_AGE.get(priority, MAX_AGE[PRIORITY_STATUS])
+        utterance = Utterance(text, priority, kind, time.monotonic(), max_age)
+        with self._cond:
+            if self._stopping:
+                return
+            heapq.heappush(self._heap, (priority, next(self._seq), utterance))
+            if len(self._heap) > self.max_queue:
+                # Evict the newest of the least urgent utterances
+                victim = max(self._heap)
+                self._heap.remove(victim)
+                heapq.heapify(self._heap)
+                self._drop(1)
+            self._cond.notify()
+
+    def _drop(self, n):
+        self.dropped += n
+        count("tts_dropped", n)
+
+    def _next_text(self):
+        """Block for the next thing worth saying; None once stopped."""
+        with self._cond:
+            while True:
+                while not self._heap and not self._stopping:
+                    self._cond.wait()
+                if not self._heap:
+                    return None
+                _, _, utterance = heapq.heappop(self._heap)
+                now = time.monotonic()
+                if now - utterance.created > utterance.max_age:
+                    self._drop(1)
+                    continue
+                if utterance.kind != "mark":
+                    self._speaking = True
+                    return utterance.text
+
+                # Fold every other pending, still fresh mark into this one
+                marks = [utterance]
+                rest = []
+                for item in self._heap:
+                    other = item[2]
+                    if other.kind == "mark":
+                        if now - other.created <= other.max_age:
+                            marks.append(other)
+                        else:
+                            self._drop(1)
+                    else:
+                        rest.append(item)
+                self._heap = rest
+                heapq.heapify(self._heap)
+                self._speaking = True
+                if len(marks) == 1:
+                    return utterance.text
+                self.coalesced += len(marks) - 1
+                count("tts_coalesced", len(marks) - 1)
+                return f"{len(marks)} students marked"
+
+    def _init_engine(self):
+        if pyttsx3 is None:
+            print("[WARNING] pyttsx3 is not installed; announcements are disabled.")
+            return None
+        try:
+            engine = pyttsx3.init(driverName=self.driver) if self.driver else pyttsx3.init()
+            engine.setProperty("rate", self.rate)
+            engine.setProperty("volume", self.volume)
+            return engine
+        except Exception as e:
+            print(f"[WARNING] Speech initialization failed: {e}")
+            return None
+
+    def run(self):
+        with timer("tts_init"):
+            engine = self._init_engine()
+        while True:
+            text = self._next_text()
+            if text is None:
+                return
+            try:
+                if engine is not None:
+                    with timer("tts"):
+                        engine.say(text)
+                        engine.runAndWait()
+                    self.spoken += 1
+                    count("tts_announcements")
+            except Exception as e:
+                print(f"[WARNING] Speech error: {e}")
+            finally:
+                with self._cond:
+                    self._speaking = False
+                    self._cond.notify_all()
+
+    def wait_idle(self, timeout=10.0):
+        """Wait until everything queued has been spoken or dropped.
+
+        Only for callers that are about to record from the microphone and
+        must not capture the prompt itself.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while (self._heap or self._speaking) and self.is_alive():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def busy(self):
+        """True while something is being said or waiting to be said."""
+        with self._cond:
+            return self._speaking or bool(self._heap)
+
+    def pending(self):
+        with self._cond:
+            return len(self._heap)
+
+    def stop(self, timeout=5.0):
+        """Finish what is queued (up to timeout) and stop the worker."""
+        self.wait_idle(timeout)
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self.is_alive():
+            self.join(timeout=1.0)
+
+    def stats(self):
+        return {"spoken": self.spoken, "dropped": self.dropped,
+                "coalesced": self.coalesced, "pending": self.pending()}
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_speech_service():
+    """Shared speaker for the process; the engine is initialised once."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = SpeechService()
+            _service.start()
+            atexit.register(_service.stop)
+        return _service
+
+
+def speak(text, priority=PRIORITY_STATUS, kind=None):
+    get_speech_service().say(text, priority, kind)
+
+
+def announce_mark(name):
+    """Attendance confirmation; merged with others when students queue up."""
+    get_speech_service().say(f"Attendance marked for {name}", PRIORITY_MARK, kind="mark")
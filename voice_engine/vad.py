@@ -0,0 +1,199 @@
+"""Continuous microphone capture with utterance segmentation.
+
+MicrophoneListener keeps one input stream open for the whole voice
+session. Audio arrives in FRAME_MS frames from the sounddevice callback;
+a background thread runs them through a VoiceSegmenter and pushes each
+finished utterance onto a queue for speech recognition. Nothing waits on
+the GUI thread and there is no gap between one student and the next.
+
+The noise floor is measured once, over the first CALIBRATE_SECONDS of the
+stream. Frames count as speech when their RMS energy clears the floor by
+SPEECH_RATIO, and, if the optional webrtcvad package is installed, when
+its classifier agrees.
+"""
+import collections
+import queue
+import threading
+import numpy as np
+
+try:
+    import webrtcvad
+except ImportError:
+    webrtcvad = None
+
+SAMPLE_RATE = 16000
+FRAME_MS = 30
+FRAME_SAMPLES = SAMPLE_RATE * FRAME_MS // 1000
+CALIBRATE_SECONDS = 1.0
+# Speech must be this many times louder than the calibrated noise floor
+SPEECH_RATIO = 3.0
+MIN_ENERGY = 300.0
+# Consecutive speech frames that open an utterance
+START_FRAMES = 3
+# Audio kept from before the utterance opened, so first syllables survive
+PRE_ROLL_MS = 300
+# Silence that closes an utterance
+HANGOVER_MS = 600
+MIN_SEGMENT_MS = 300
+MAX_SEGMENT_MS = 6000
+# 0-3, higher filters out more non-speech
+WEBRTC_AGGRESSIVENESS = 2
+# Finished utterances waiting for recognition; older ones are dropped
+SEGMENT_QUEUE = 4
+
+
+def frame_energy(frame):
+    samples = np.frombuffer(frame, dtype=np.int16).astype(np.float32)
+    return float(np.sqrt(np.mean(samples * samples))) if samples.size else 0.0
+
+
+class VoiceSegmenter:
+    """Turns a stream of 16-bit mono frames into utterances."""
+
+    def __init__(self, sample_rate=SAMPLE_RATE, frame_ms=FRAME_MS):
+        self.sample_rate = sample_rate
+        self.frame_ms = frame_ms
+        self.noise_floor = None
+        self.threshold = None
+        self._calibration = []
+        self._calibration_frames = int(CALIBRATE_SECONDS * 1000 / frame_ms)
+        self._pre_roll = collections.deque(maxlen=PRE_ROLL_MS // frame_ms)
+        self._segment = None
+        self._speech_run = 0
+        self._silence_run = 0
+        self._vad = webrtcvad.Vad(WEBRTC_AGGRESSIVENESS) if webrtcvad is not None else None
+
+    @property
+    def calibrated(self):
+        return self.threshold is not None
+
+    def _calibrate(self, energy):
+        self._calibration.append(energy)
+        if len(self._calibration) >= self._calibration_frames:
+            # Median, so a cough during calibration does not raise the floor
+            self.noise_floor = float(np.median(self._calibration))
+            self.threshold = max(MIN_ENERGY, self.noise_floor * SPEECH_RATIO)
+            self._calibration = []
+            print(f"[INFO] Voice noise floor {self.noise_floor:.0f}, threshold {self.threshold:.0f}")
+
+    def is_speech(self, frame, energy):
+        if energy < self.threshold:
+            return False
+        if self._vad is not None:
+            try:
+                return self._vad.is_speech(frame, self.sample_rate)
+            except Exception:
+                return True
+        return True
+
+    def reset(self):
+        """Drop any partial utterance, e.g. while announcements play."""
+        self._pre_roll.clear()
+        self._segment = None
+        self._speech_run = 0
+        self._silence_run = 0
+
+    def feed(self, frame):
+        """Add one frame; returns the PCM bytes of an utterance when one ends."""
+        energy = frame_energy(frame)
+        if not self.calibrated:
+            self._calibrate(energy)
+            return None
+
+        speech = self.is_speech(frame, energy)
+        if self._segment is None:
+            self._pre_roll.append(frame)
+            self._speech_run = self._speech_run + 1 if speech else 0
+            if self._speech_run >= START_FRAMES:
+                self._segment = list(self._pre_roll)
+                self._pre_roll.clear()
+                self._silence_run = 0
+            return None
+
+        self._segment.append(frame)
+        self._silence_run = 0 if speech else self._silence_run + 1
+        length_ms = len(self._segment) * self.frame_ms
+        if self._silence_run * self.frame_ms >= HANGOVER_MS or length_ms >= MAX_SEGMENT_MS:
+            segment = self._segment
+            if self._silence_run:
+                segment = segment[:-self._silence_run]
+            self.reset()
+            if len(segment) * self.frame_ms >= MIN_SEGMENT_MS:
+                return b"".join(segment)
+        return None
+
+
+class MicrophoneListener(threading.Thread):
+    """Streams the microphone through a VoiceSegmenter on its own thread.
+
+    Finished utterances are put on `segments` as raw 16 kHz 16-bit mono
+    PCM. `muted` is checked per frame; while it returns True (for example
+    while the announcement voice is talking) audio is discarded so the
+    system does not hear itself.
+    """
+
+    def __init__(self, segments=None, muted=None, sample_rate=SAMPLE_RATE, device=None):
+        super().__init__(daemon=True, name="MicrophoneListener")
+        self.segments = segments if segments is not None else queue.Queue(maxsize=SEGMENT_QUEUE)
+        self.muted = muted or (lambda: False)
+        self.sample_rate = sample_rate
+        self.device = device
+        self.segmenter = VoiceSegmenter(sample_rate)
+        self.error = None
+        self._frames = queue.Queue(maxsize=200)
+        self._running = threading.Event()
+        self._running.set()
+        self.dropped_frames = 0
+        self.dropped_segments = 0
+
+    def _callback(self, indata, frames, time_info, status):
+        try:
+            self._frames.put_nowait(bytes(indata))
+        except queue.Full:
+            self.dropped_frames += 1
+
+    def _emit(self, segment):
+        try:
+            self.segments.put_nowait(segment)
+        except queue.Full:
+            # Recognition is behind; the oldest utterance is the least useful
+            try:
+                self.segments.get_nowait()
+                self.dropped_segments += 1
+            except queue.Empty:
+                pass
+            self.segments.put_nowait(segment)
+
+    def run(self):
+        try:
+            import sounddevice as sd
+            stream = sd.RawInputStream(samplerate=self.sample_rate, channels=1, dtype="int16",
+                                       blocksize=FRAME_SAMPLES, device=self.device,
+                                       callback=self._callback)
+        except Exception as e:
+            self.error = e
+            print(f"[ERROR] Cannot open microphone: {e}")
+            return
+
+        with stream:
+            was_muted = False
+            while self._running.is_set():
+                try:
+                    frame = self._frames.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                # Announcements must not end up in the noise floor or a segment
+                if self.muted():
+                    if not was_muted:
+                        self.segmenter.reset()
+                        was_muted = True
+                    continue
+                was_muted = False
+                segment = self.segmenter.feed(frame)
+                if segment is not None:
+                    self._emit(segment)
+
+    def stop(self):
+        self._running.clear()
+        if self.is_alive():
+            self.join(timeout=1.0)
@@ -0,0 +1,91 @@
+import queue
+import threading
+from PyQt5.QtCore import QThread, pyqtSignal
+from voice_engine.vad import MicrophoneListener, SAMPLE_RATE, SEGMENT_QUEUE
+from voice_engine.speech_backends import create_backend
+from voice_engine.tts import get_speech_service
+
+
+class VoiceAttendanceWorker(QThread):
+    """Listens continuously and emits what each utterance said.
+
+    A MicrophoneListener segments the stream on its own thread; this
+    thread drains the segment queue and runs speech recognition, so the
+    GUI only ever receives finished text through heard.
+    """
+
+    heard = pyqtSignal(str)
+    failed = pyqtSignal(str)
+
+    def __init__(self, backend=None, parent=None):
+        super().__init__(parent)
+        # Any speech_backends.SpeechBackend; vosk offline when available
+        self.backend = backend or create_backend()
+        self.segments = queue.Queue(maxsize=SEGMENT_QUEUE)
+        speech = get_speech_service()
+        self.listener = MicrophoneListener(self.segments, muted=speech.busy)
+        self.recognized = 0
+        self.unrecognized = 0
+        self._vocabulary_lock = threading.Lock()
+        self._pending_vocabulary = None
+
+    def set_vocabulary(self, vocabulary):
+        """Swap the backend's roster; applied before the next utterance.
+
+        transcribe() runs on this thread, so the backend is only touched
+        here and never from the GUI thread that notices roster changes.
+        """
+        with self._vocabulary_lock:
+            self._pending_vocabulary = vocabulary
+
+    def _apply_vocabulary(self):
+        with self._vocabulary_lock:
+            vocabulary, self._pending_vocabulary = self._pending_vocabulary, None
+        if vocabulary is not None:
+            self.backend.set_vocabulary(vocabulary)
+
+    def run(self):
+        # Model loading can take seconds; do it here, not on the GUI thread
+        try:
+            self.backend.load()
+        except Exception as e:
+            self.failed.emit(f"Speech recognition could not start: {e}")
+            return
+        self.listener.start()
+        while not self.isInterruptionRequested():
+            if not self.listener.is_alive():
+                if self.listener.error is not None:
+                    self.failed.emit(str(self.listener.error))
+                return
+            try:
+                segment = self.segments.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            self._apply_vocabulary()
+            try:
+                text = self.backend.transcribe(segment, SAMPLE_RATE)
+            except Exception as e:
+                print(f"[ERROR] Speech recognition failed: {e}")
+                text = None
+            if text:
+                self.recognized += 1
+                print(f"[VOICE] Recognized: {text}")
+                self.heard.emit(text.lower())
+            else:
+                self.unrecognized += 1
+
+    def stats(self):
+        return {
+            "backend": self.backend.name,
+            "recognized": self.recognized,
+            "unrecognized": self.unrecognized,
+            "dropped_segments": self.listener.dropped_segments,
+            "dropped_frames": self.listener.dropped_frames,
+        }
+
+    def stop(self):
+        self.requestInterruption()
+        self.listener.stop()
+        # Wait for run() to return: a transcription in flight is bounded by
+        # the backend's timeout, and destroying a running QThread aborts
+        self.wait()